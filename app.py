@@ -1,9 +1,35 @@
 import os
 import json
 import copy
+import time
+import hashlib
+import cProfile
+import pstats
+import tracemalloc
+import tempfile
+import functools
+import gzip
+import shutil
+import sqlite3
+import subprocess
+import signal
+import struct
 import uuid
 import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import re
+import sys
+from datetime import datetime
+from types import MappingProxyType
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dotenv import load_dotenv
+import aiohttp
+import yarl
 import discord
 from discord.ext import commands
 from discord import app_commands
@@ -12,15 +38,126 @@ from discord import app_commands
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 WELCOME_AUDIO_PATH = os.getenv("WELCOME_AUDIO_PATH", "voice.mp3")
+DEV_GUILD_ID = os.getenv("DEV_GUILD_ID")
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "").strip().lower() in ("1", "true", "yes")
+
+LEAN_GATEWAY = os.getenv("LEAN_GATEWAY", "0").strip().lower() in ("1", "true", "yes")
 
 # Intents
 intents = discord.Intents.default()
 intents.voice_states = True
-intents.members = True
-intents.message_content = True
+if LEAN_GATEWAY:
+    # Only members in voice are ever needed; everyone else is fetched on demand.
+    intents.members = False
+    intents.message_content = False
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
+else:
+    intents.members = True
+    intents.message_content = True
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+
+# REST client tuning
+REST_POOL_LIMIT = int(os.getenv("REST_POOL_LIMIT", "0"))
+REST_POOL_LIMIT_PER_HOST = int(os.getenv("REST_POOL_LIMIT_PER_HOST", "0"))
+REST_KEEPALIVE_SECONDS = float(os.getenv("REST_KEEPALIVE_SECONDS", "30"))
+REST_DNS_CACHE_SECONDS = int(os.getenv("REST_DNS_CACHE_SECONDS", "300"))
+REST_PROXY = os.getenv("REST_PROXY") or None
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE")
+DISCORD_GATEWAY_URL = os.getenv("DISCORD_GATEWAY_URL")
+if DISCORD_API_BASE:
+    # Local stand-in (fake_discord.py). The webhook adapter used for interaction callbacks
+    # imports this same Route class, so one assignment covers both.
+    discord.http.Route.BASE = DISCORD_API_BASE.rstrip("/")
+if DISCORD_GATEWAY_URL:
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(DISCORD_GATEWAY_URL)
+REST_TOKEN_PATH = re.compile(r"/(webhooks|interactions)/(\d+)/[^/]+")
+REST_SNOWFLAKE = re.compile(r"/\d{15,}")
+
+
+def _rest_route(method: str, url) -> str:
+    path = url.path.split("/api/v", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else path
+    path = REST_TOKEN_PATH.sub(r"/\1/:id/:token", path)
+    return f"{method} {REST_SNOWFLAKE.sub('/:id', path)}"
+
+
+async def _on_rest_request_start(session, trace_ctx, params):
+    trace_ctx.started_at = time.perf_counter()
+
+
+async def _on_rest_request_end(session, trace_ctx, params):
+    route = _rest_route(params.method, params.url)
+    increment_stat("rest_requests")
+    record_timing(f"rest {route}", (time.perf_counter() - trace_ctx.started_at) * 1000)
+    status = params.response.status
+    if status == 429:
+        increment_stat("rest_429")
+        logger.warning("تم تجاوز حد الطلبات (429) في %s", route)
+    elif status >= 500:
+        increment_stat("rest_5xx")
+
+
+async def _on_rest_request_exception(session, trace_ctx, params):
+    increment_stat("rest_errors")
+
+
+async def _on_rest_connection_create_start(session, trace_ctx, params):
+    trace_ctx.connect_started_at = time.perf_counter()
+
+
+async def _on_rest_connection_create_end(session, trace_ctx, params):
+    increment_stat("rest_connections_created")
+    record_timing("rest_connect_ms", (time.perf_counter() - trace_ctx.connect_started_at) * 1000)
+
+
+async def _on_rest_connection_reuse(session, trace_ctx, params):
+    increment_stat("rest_connections_reused")
+
+
+async def _on_rest_dns_start(session, trace_ctx, params):
+    trace_ctx.dns_started_at = time.perf_counter()
+
+
+async def _on_rest_dns_end(session, trace_ctx, params):
+    record_timing("rest_dns_ms", (time.perf_counter() - trace_ctx.dns_started_at) * 1000)
+
+
+rest_trace = aiohttp.TraceConfig()
+rest_trace.on_request_start.append(_on_rest_request_start)
+rest_trace.on_request_end.append(_on_rest_request_end)
+rest_trace.on_request_exception.append(_on_rest_request_exception)
+rest_trace.on_connection_create_start.append(_on_rest_connection_create_start)
+rest_trace.on_connection_create_end.append(_on_rest_connection_create_end)
+rest_trace.on_connection_reuseconn.append(_on_rest_connection_reuse)
+rest_trace.on_dns_resolvehost_start.append(_on_rest_dns_start)
+rest_trace.on_dns_resolvehost_end.append(_on_rest_dns_end)
+
+
+def create_rest_connector() -> aiohttp.TCPConnector:
+    # Must run inside the event loop; discord.py would otherwise build an unlimited default.
+    return aiohttp.TCPConnector(
+        limit=REST_POOL_LIMIT,
+        limit_per_host=REST_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=REST_KEEPALIVE_SECONDS,
+        ttl_dns_cache=REST_DNS_CACHE_SECONDS,
+    )
+
 
 # Bot instance
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = commands.Bot(
+    command_prefix="!",
+    intents=intents,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=not LEAN_GATEWAY,
+    proxy=REST_PROXY,
+    http_trace=rest_trace,
+)
+
+# Console logging goes through a queue so the event loop never blocks on stdout
+logger = logging.getLogger("join_voice_bot")
+log_queue = queue.SimpleQueue()
+log_listener = None
 
 # Persistence files
 TARGET_CHANNEL_FILE = "target_channel.txt"
@@ -28,8 +165,67 @@ LOG_CHANNEL_FILE = "log_channel.txt"
 NOTIFY_CHANNEL_FILE = "notify_channel.txt"
 BRING_ROLES_FILE = "bring_roles.json"
 EMBED_SETTINGS_FILE = "embed_settings.json"
+COMMAND_SYNC_FILE = "command_sync.json"
+WELCOME_CLIPS_FILE = "welcome_clips.json"
+STATE_SNAPSHOT_FILE = "state_snapshot.json"
+CLIPS_DIR = "clips"
+PROFILES_DIR = "profiles"
+CLIP_EXTENSIONS = (".mp3", ".wav", ".ogg", ".opus", ".m4a", ".flac")
+OPUS_FRAMES_SUFFIX = ".opusframes"
+OPUS_FRAMES_MAGIC = b"JVBOPUS1"
+CLIP_INGEST_FILTERS = (
+    "silenceremove=start_periods=1:start_threshold=-50dB:start_silence=0.05,"
+    "areverse,silenceremove=start_periods=1:start_threshold=-50dB:start_silence=0.05,areverse,"
+    "loudnorm=I=-16:TP=-1.5:LRA=11"
+)
+CLIP_DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
 
 BRING_BUTTON_LABEL = "سحب"
+BRING_ALL_CONCURRENCY = int(os.getenv("BRING_ALL_CONCURRENCY", "5"))
+BRING_SELECT_MAX_OPTIONS = 25
+BRING_VIEW_TIMEOUT = 900
+STARTUP_CONCURRENCY = int(os.getenv("STARTUP_CONCURRENCY", "10"))
+EMBED_WATCH_INTERVAL = float(os.getenv("EMBED_WATCH_INTERVAL", "2"))
+WRITE_COALESCE_SECONDS = float(os.getenv("WRITE_COALESCE_SECONDS", "0.5"))
+VOICE_IDLE_TIMEOUT = float(os.getenv("VOICE_IDLE_TIMEOUT", "300"))
+VOICE_WATCHDOG_INTERVAL = float(os.getenv("VOICE_WATCHDOG_INTERVAL", "30"))
+VOICE_WATCHDOG_CONCURRENCY = int(os.getenv("VOICE_WATCHDOG_CONCURRENCY", "10"))
+VOICE_HEALTH_GRACE = 15.0
+VOICE_MAX_HEARTBEAT_LATENCY = float(os.getenv("VOICE_MAX_HEARTBEAT_LATENCY", "5"))
+VOICE_CONNECT_TIMEOUT = 15.0
+VOICE_CONNECT_ATTEMPTS = 3
+VOICE_RECONNECT_BASE_DELAY = 1.0
+GUILD_STATE_MAX = int(os.getenv("GUILD_STATE_MAX", "1000"))
+GUILD_STATE_IDLE_SECONDS = float(os.getenv("GUILD_STATE_IDLE_SECONDS", "3600"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "20"))
+STATE_SNAPSHOT_MAX_AGE = float(os.getenv("STATE_SNAPSHOT_MAX_AGE", "900"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_PROBE_INTERVAL = float(os.getenv("CIRCUIT_PROBE_INTERVAL", "60"))
+CIRCUIT_MAX_PROBE_INTERVAL = 900.0
+JOURNAL_ENABLED = os.getenv("JOURNAL_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", os.path.join("logs", "events.jsonl"))
+JOURNAL_MIN_LEVEL = os.getenv("JOURNAL_MIN_LEVEL", "info")
+JOURNAL_MAX_BYTES = int(os.getenv("JOURNAL_MAX_BYTES", str(10 * 1024 * 1024)))
+JOURNAL_ROTATE_SECONDS = float(os.getenv("JOURNAL_ROTATE_SECONDS", "86400"))
+JOURNAL_BACKUPS = int(os.getenv("JOURNAL_BACKUPS", "14"))
+JOURNAL_GZIP = os.getenv("JOURNAL_GZIP", "1").strip().lower() in ("1", "true", "yes")
+JOURNAL_FLUSH_INTERVAL = 1.0
+JOURNAL_BATCH_SIZE = 200
+JOURNAL_MAX_BUFFER = 10000
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MAX_CLIP_SECONDS = int(os.getenv("MAX_CLIP_SECONDS", "30"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+MAX_CLIP_UPLOAD_BYTES = int(os.getenv("MAX_CLIP_UPLOAD_BYTES", str(8 * 1024 * 1024)))
+SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", "0"))
+USE_UVLOOP = os.getenv("USE_UVLOOP", "").strip().lower() in ("1", "true", "yes")
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "1"))
+PROFILE_MAX_SECONDS = 120
+PROFILE_TOP_ENTRIES = 10
+AUDIT_DB_PATH = os.getenv("AUDIT_DB_PATH", "audit.db")
+AUDIT_RETENTION_DAYS = float(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+AUDIT_FLUSH_DELAY = 0.5
+AUDIT_PAGE_SIZE = 10
+WARM_VOICE_CONNECT = os.getenv("WARM_VOICE_CONNECT", "").strip().lower() in ("1", "true", "yes")
 
 DEFAULT_EMBED_SETTINGS = {
     "global": {
@@ -49,9 +245,25 @@ DEFAULT_EMBED_SETTINGS = {
     }
 }
 
-EMBED_SETTINGS = {}
-guild_voice_locks = {}
+background_tasks = set()
+BOT_STATS = {"counters": {}, "gauges": {}, "timings": {}}
 bot_enabled = True
+commands_synced = False
+startup_started = False
+restored_voice_channels = {}
+shutting_down = False
+profile_running = False
+inflight_handlers = set()
+PROCESS_STARTED_AT = time.perf_counter()
+PERSISTENCE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persistence")
+pending_writes = {}
+inflight_writes = {}
+pending_write_tasks = {}
+persistence_write_locks = {}
+file_update_locks = {}
+AUDIO_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="audio")
+audio_load_tasks = {}
+ingest_executor = None
 
 DEFAULT_LOG_LEVEL = "info"
 LOG_LEVEL_PRIORITIES = {
@@ -61,6 +273,17 @@ LOG_LEVEL_PRIORITIES = {
     "error": 40,
     "critical": 50,
 }
+# Discord rejects embeds over these limits (characters).
+EMBED_LIMITS = {
+    "title": 256,
+    "description": 4096,
+    "field_name": 256,
+    "field_value": 1024,
+    "footer_text": 2048,
+    "author_name": 256,
+}
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_TOTAL = 6000
 LOG_LEVEL_ICONS = {
     "debug": "🔍",
     "info": "ℹ️",
@@ -92,23 +315,6 @@ def _deep_merge_dict(base: dict, override: dict) -> dict:
     return merged
 
 
-def _load_embed_settings() -> dict:
-    if not os.path.exists(EMBED_SETTINGS_FILE):
-        with open(EMBED_SETTINGS_FILE, "w", encoding="utf-8") as file:
-            json.dump(DEFAULT_EMBED_SETTINGS, file, ensure_ascii=False, indent=2)
-        return copy.deepcopy(DEFAULT_EMBED_SETTINGS)
-
-    try:
-        with open(EMBED_SETTINGS_FILE, "r", encoding="utf-8") as file:
-            loaded = json.load(file)
-        if not isinstance(loaded, dict):
-            raise ValueError("يجب أن يكون ملف إعدادات الـ Embed كائن JSON (Object).")
-        return _deep_merge_dict(DEFAULT_EMBED_SETTINGS, loaded)
-    except Exception as error:
-        print(f"تعذر تحميل {EMBED_SETTINGS_FILE}: {error}")
-        return copy.deepcopy(DEFAULT_EMBED_SETTINGS)
-
-
 def _parse_color(color_value):
     if isinstance(color_value, int):
         return discord.Color(color_value & 0xFFFFFF)
@@ -139,15 +345,191 @@ def _normalize_log_level(level: str) -> str:
     return normalized
 
 
-def _get_min_log_level() -> str:
-    configured = EMBED_SETTINGS.get("global", {}).get("log_min_level", DEFAULT_LOG_LEVEL)
-    return _normalize_log_level(configured)
+def _level_priority(level) -> int:
+    priority = LOG_LEVEL_PRIORITIES.get(level)
+    if priority is None:
+        priority = LOG_LEVEL_PRIORITIES[_normalize_log_level(level)]
+    return priority
+
+
+def log_enabled(level: str) -> bool:
+    # Cheap guard for callers that want to skip building expensive log arguments.
+    return _level_priority(level) >= send_log_threshold
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _is_valid_color(color_value) -> bool:
+    if isinstance(color_value, bool):
+        return False
+    if isinstance(color_value, int):
+        return True
+    if isinstance(color_value, str):
+        raw = color_value.strip().lower().lstrip("#")
+        if raw.startswith("0x"):
+            raw = raw[2:]
+        try:
+            int(raw, 16)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _validate_embed_settings(settings) -> list:
+    if not isinstance(settings, dict):
+        return ["يجب أن يكون ملف إعدادات الـ Embed كائن JSON (Object)."]
+
+    errors = []
+    global_settings = settings.get("global", {})
+    embeds = settings.get("embeds", {})
+    if not isinstance(global_settings, dict):
+        errors.append("`global` must be an object.")
+        global_settings = {}
+    if not isinstance(embeds, dict):
+        errors.append("`embeds` must be an object.")
+        embeds = {}
+
+    min_level = global_settings.get("log_min_level", DEFAULT_LOG_LEVEL)
+    if str(min_level).strip().lower() not in LOG_LEVEL_PRIORITIES:
+        errors.append(f"global.log_min_level has an unknown level: {min_level}")
+    if "color" in global_settings and not _is_valid_color(global_settings["color"]):
+        errors.append(f"global.color is not a valid color: {global_settings['color']}")
+
+    for embed_key, embed_settings in embeds.items():
+        if not isinstance(embed_settings, dict):
+            errors.append(f"embeds.{embed_key} must be an object.")
+            continue
+        if "color" in embed_settings and not _is_valid_color(embed_settings["color"]):
+            errors.append(f"embeds.{embed_key}.color is not a valid color: {embed_settings['color']}")
+        fields = embed_settings.get("fields", [])
+        if not isinstance(fields, list):
+            errors.append(f"embeds.{embed_key}.fields must be a list.")
+            continue
+        for index, field in enumerate(fields):
+            if not isinstance(field, dict):
+                errors.append(f"embeds.{embed_key}.fields[{index}] must be an object.")
+    return errors
+
+
+class EmbedSettingsSnapshot:
+    __slots__ = ("settings", "colors", "default_color", "min_log_level", "min_log_priority", "file_state")
+
+    def __init__(self, settings: dict, file_state=None):
+        global_settings = settings.get("global", {})
+        default_color = _parse_color(global_settings.get("color", "#3B82F6"))
+        self.settings = _freeze(settings)
+        self.default_color = default_color
+        self.colors = MappingProxyType({
+            embed_key: _parse_color(embed_settings["color"]) if "color" in embed_settings else default_color
+            for embed_key, embed_settings in settings.get("embeds", {}).items()
+        })
+        self.min_log_level = _normalize_log_level(global_settings.get("log_min_level", DEFAULT_LOG_LEVEL))
+        self.min_log_priority = LOG_LEVEL_PRIORITIES[self.min_log_level]
+        self.file_state = file_state
+
+
+def _embed_settings_file_state():
+    try:
+        stat = os.stat(EMBED_SETTINGS_FILE)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_embed_snapshot() -> EmbedSettingsSnapshot:
+    if not os.path.exists(EMBED_SETTINGS_FILE):
+        _write_json(EMBED_SETTINGS_FILE, DEFAULT_EMBED_SETTINGS)
+        return EmbedSettingsSnapshot(DEFAULT_EMBED_SETTINGS, _embed_settings_file_state())
+
+    file_state = _embed_settings_file_state()
+    with open(EMBED_SETTINGS_FILE, "r", encoding="utf-8") as file:
+        loaded = json.load(file)
+    errors = _validate_embed_settings(loaded)
+    if not errors:
+        merged = _deep_merge_dict(DEFAULT_EMBED_SETTINGS, loaded)
+        errors = _validate_embed_settings(merged)
+    if errors:
+        raise ValueError("; ".join(errors))
+    return EmbedSettingsSnapshot(merged, file_state)
+
+
+def _load_embed_settings() -> EmbedSettingsSnapshot:
+    try:
+        return _load_embed_snapshot()
+    except Exception as error:
+        logger.error("تعذر تحميل %s: %s", EMBED_SETTINGS_FILE, error)
+        return EmbedSettingsSnapshot(DEFAULT_EMBED_SETTINGS, _embed_settings_file_state())
+
+
+async def reload_embed_settings() -> str:
+    global embed_snapshot, embed_settings_failed_state
+    try:
+        snapshot = await run_io(_load_embed_snapshot)
+    except Exception as error:
+        increment_stat("embed_settings_reload_failed")
+        embed_settings_failed_state = await run_io(_embed_settings_file_state)
+        logger.error("تعذر تحميل %s، تم الإبقاء على آخر إعدادات صالحة: %s", EMBED_SETTINGS_FILE, error)
+        return _shorten_text(error, 1000)
+    embed_snapshot = snapshot
+    embed_settings_failed_state = None
+    apply_log_threshold()
+    increment_stat("embed_settings_reloaded")
+    return ""
+
+
+async def watch_embed_settings():
+    while True:
+        await asyncio.sleep(EMBED_WATCH_INTERVAL)
+        try:
+            file_state = await run_io(_embed_settings_file_state)
+        except Exception:
+            continue
+        if file_state is None or file_state == embed_snapshot.file_state or file_state == embed_settings_failed_state:
+            continue
+        error_text = await reload_embed_settings()
+        if error_text:
+            continue
+        logger.info("تمت إعادة تحميل %s تلقائياً بعد تعديله.", EMBED_SETTINGS_FILE)
 
 
-def _should_emit_log(level: str) -> bool:
-    normalized = _normalize_log_level(level)
-    current_min = _get_min_log_level()
-    return LOG_LEVEL_PRIORITIES[normalized] >= LOG_LEVEL_PRIORITIES[current_min]
+def setup_logging():
+    global log_listener
+    if log_listener is not None:
+        return
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    for logger_name in (logger.name, "discord"):
+        target_logger = logging.getLogger(logger_name)
+        target_logger.addHandler(queue_handler)
+        target_logger.propagate = False
+    logging.getLogger("discord").setLevel(logging.INFO)
+    log_listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+    log_listener.start()
+
+
+def apply_log_threshold():
+    # LOG_LEVEL_PRIORITIES uses the same numbers as the logging module.
+    global log_threshold, send_log_threshold
+    log_threshold = embed_snapshot.min_log_priority
+    journal_threshold = LOG_LEVEL_PRIORITIES[_normalize_log_level(JOURNAL_MIN_LEVEL)] if JOURNAL_ENABLED else log_threshold
+    send_log_threshold = min(log_threshold, journal_threshold)
+    logger.setLevel(log_threshold)
+
+
+embed_snapshot = EmbedSettingsSnapshot(DEFAULT_EMBED_SETTINGS)
+log_threshold = embed_snapshot.min_log_priority
+send_log_threshold = log_threshold
+apply_log_threshold()
+embed_settings_failed_state = None
+embed_watcher_task = None
 
 
 def _shorten_text(text, limit: int = 1800) -> str:
@@ -170,54 +552,74 @@ def _channel_context(channel, prefix: str) -> dict:
     }
 
 
-def build_context(guild: discord.Guild = None, actor=None, extra: dict = None) -> dict:
-    context = {
-        "event": "غير معروف",
-        "details": "غير معروف",
-        "event_id": "غير معروف",
-        "level": DEFAULT_LOG_LEVEL,
-        "level_upper": DEFAULT_LOG_LEVEL.upper(),
-        "level_icon": LOG_LEVEL_ICONS[DEFAULT_LOG_LEVEL],
-        "request_id": "غير معروف",
-        "command_name": "غير معروف",
-        "state": "غير معروف",
-        "audio_path": WELCOME_AUDIO_PATH,
-        "settings_file": EMBED_SETTINGS_FILE,
-        "error_text": "غير معروف",
-        "actor_mention": "غير معروف",
-        "actor_display_name": "غير معروف",
-        "actor_id": "غير معروف",
-        "actor_avatar_url": "",
-        "user_mention": "غير معروف",
-        "user_display_name": "غير معروف",
-        "user_id": "غير معروف",
-        "user_avatar_url": "",
-        "target_mention": "غير معروف",
-        "target_display_name": "غير معروف",
-        "target_id": "غير معروف",
-        "voice_channel_mention": "غير معروف",
-        "voice_channel_name": "غير معروف",
-        "voice_channel_id": "غير معروف",
-        "text_channel_mention": "غير معروف",
-        "text_channel_name": "غير معروف",
-        "text_channel_id": "غير معروف",
-        "destination_channel_mention": "غير معروف",
-        "destination_channel_name": "غير معروف",
-        "destination_channel_id": "غير معروف",
-        "guild_name": "غير معروف",
-        "guild_id": "غير معروف",
-        "bot_user": "غير معروف",
-        "bot_id": "غير معروف",
-        "bot_avatar_url": "",
+BASE_CONTEXT = MappingProxyType({
+    "event": "غير معروف",
+    "details": "غير معروف",
+    "event_id": "غير معروف",
+    "level": DEFAULT_LOG_LEVEL,
+    "level_upper": DEFAULT_LOG_LEVEL.upper(),
+    "level_icon": LOG_LEVEL_ICONS[DEFAULT_LOG_LEVEL],
+    "request_id": "غير معروف",
+    "command_name": "غير معروف",
+    "state": "غير معروف",
+    "audio_path": WELCOME_AUDIO_PATH,
+    "settings_file": EMBED_SETTINGS_FILE,
+    "error_text": "غير معروف",
+    "actor_mention": "غير معروف",
+    "actor_display_name": "غير معروف",
+    "actor_id": "غير معروف",
+    "actor_avatar_url": "",
+    "user_mention": "غير معروف",
+    "user_display_name": "غير معروف",
+    "user_id": "غير معروف",
+    "user_avatar_url": "",
+    "target_mention": "غير معروف",
+    "target_display_name": "غير معروف",
+    "target_id": "غير معروف",
+    "voice_channel_mention": "غير معروف",
+    "voice_channel_name": "غير معروف",
+    "voice_channel_id": "غير معروف",
+    "text_channel_mention": "غير معروف",
+    "text_channel_name": "غير معروف",
+    "text_channel_id": "غير معروف",
+    "destination_channel_mention": "غير معروف",
+    "destination_channel_name": "غير معروف",
+    "destination_channel_id": "غير معروف",
+    "guild_name": "غير معروف",
+    "guild_id": "غير معروف",
+    "bot_user": "غير معروف",
+    "bot_id": "غير معروف",
+    "bot_avatar_url": "",
+})
+bot_identity = {}
+
+
+def refresh_bot_identity():
+    global bot_identity
+    user = bot.user
+    if user is None:
+        bot_identity = {}
+        return
+    bot_identity = {
+        "bot_user": str(user),
+        "bot_id": str(user.id),
+        "bot_avatar_url": str(user.display_avatar.url),
     }
-    if bot.user:
-        context["bot_user"] = str(bot.user)
-        context["bot_id"] = str(bot.user.id)
-        context["bot_avatar_url"] = str(bot.user.display_avatar.url)
+
+
+def get_guild_identity(guild: discord.Guild) -> dict:
+    state = guild_states.get(guild.id)
+    if state.identity is None:
+        state.identity = {"guild_name": guild.name, "guild_id": str(guild.id)}
+    return state.identity
+
+
+def build_context(guild: discord.Guild = None, actor=None, extra: dict = None) -> dict:
+    context = dict(BASE_CONTEXT)
+    context.update(bot_identity)
 
     if guild:
-        context["guild_name"] = guild.name
-        context["guild_id"] = str(guild.id)
+        context.update(get_guild_identity(guild))
 
     if actor:
         mention = getattr(actor, "mention", str(actor))
@@ -240,16 +642,72 @@ def build_context(guild: discord.Guild = None, actor=None, extra: dict = None) -
     return context
 
 
+def _fit_embed_text(text: str, budget: int) -> str:
+    if len(text) <= budget:
+        return text
+    increment_stat("embed_truncations")
+    return _shorten_text(text, budget)
+
+
+def _embed_total_cap(lengths: list):
+    # Largest per-part length that brings the rendered total within EMBED_MAX_TOTAL,
+    # so only the longest parts are shortened. None when everything already fits.
+    if sum(lengths) <= EMBED_MAX_TOTAL:
+        return None
+    remaining = EMBED_MAX_TOTAL
+    ordered = sorted(lengths)
+    for index, length in enumerate(ordered):
+        parts_left = len(ordered) - index
+        if length * parts_left > remaining:
+            return remaining // parts_left
+        remaining -= length
+    return None
+
+
 def build_embed(embed_key: str, context: dict = None) -> discord.Embed:
     context = context or {}
-    global_settings = EMBED_SETTINGS.get("global", {})
-    embeds = EMBED_SETTINGS.get("embeds", {})
-    embed_settings = embeds.get(embed_key, embeds.get("default", {}))
-
-    title = _format_text(embed_settings.get("title", "بوت الانضمام الصوتي"), context)
-    description = _format_text(embed_settings.get("description", ""), context)
-    color = _parse_color(embed_settings.get("color", global_settings.get("color", "#3B82F6")))
+    snapshot = embed_snapshot
+    global_settings = snapshot.settings.get("global", {})
+    embeds = snapshot.settings.get("embeds", {})
+    if embed_key not in embeds:
+        embed_key = "default"
+    embed_settings = embeds.get(embed_key, {})
+
+    # Render every counted part and apply its own Discord limit first.
+    title = _fit_embed_text(_format_text(embed_settings.get("title", "بوت الانضمام الصوتي"), context), EMBED_LIMITS["title"])
+    description = _fit_embed_text(_format_text(embed_settings.get("description", ""), context), EMBED_LIMITS["description"])
+    author_name = _fit_embed_text(_format_text(embed_settings.get("author_name", ""), context), EMBED_LIMITS["author_name"])
+    footer_text = _fit_embed_text(
+        _format_text(embed_settings.get("footer_text", global_settings.get("footer_text", "")), context),
+        EMBED_LIMITS["footer_text"],
+    )
+    rendered_fields = []
+    fields = embed_settings.get("fields", [])
+    if isinstance(fields, (list, tuple)):
+        for field in fields:
+            if not isinstance(field, Mapping):
+                continue
+            if len(rendered_fields) >= EMBED_MAX_FIELDS:
+                increment_stat("embed_fields_dropped")
+                break
+            rendered_fields.append((
+                _fit_embed_text(_format_text(field.get("name", "-"), context), EMBED_LIMITS["field_name"]),
+                _fit_embed_text(_format_text(field.get("value", "-"), context), EMBED_LIMITS["field_value"]),
+                bool(field.get("inline", False)),
+            ))
+
+    # Only when the real total is over 6000 are the longest parts cut down to a shared cap.
+    cap = _embed_total_cap(
+        [len(title), len(description), len(author_name), len(footer_text)]
+        + [len(text) for name, value, _ in rendered_fields for text in (name, value)]
+    )
+    if cap is not None:
+        title, description, author_name, footer_text = (
+            _fit_embed_text(text, cap) for text in (title, description, author_name, footer_text)
+        )
+        rendered_fields = [(_fit_embed_text(name, cap), _fit_embed_text(value, cap), inline) for name, value, inline in rendered_fields]
 
+    color = snapshot.colors.get(embed_key, snapshot.default_color)
     embed = discord.Embed(title=title, description=description, color=color)
 
     if bool(embed_settings.get("timestamp", global_settings.get("timestamp", False))):
@@ -263,7 +721,6 @@ def build_embed(embed_key: str, context: dict = None) -> discord.Embed:
     if image_url:
         embed.set_image(url=image_url)
 
-    author_name = _format_text(embed_settings.get("author_name", ""), context)
     author_icon_url = _format_text(embed_settings.get("author_icon_url", ""), context)
     if author_name:
         if author_icon_url:
@@ -271,7 +728,6 @@ def build_embed(embed_key: str, context: dict = None) -> discord.Embed:
         else:
             embed.set_author(name=author_name)
 
-    footer_text = _format_text(embed_settings.get("footer_text", global_settings.get("footer_text", "")), context)
     footer_icon_url = _format_text(embed_settings.get("footer_icon_url", global_settings.get("footer_icon_url", "")), context)
     if footer_text:
         if footer_icon_url:
@@ -279,15 +735,8 @@ def build_embed(embed_key: str, context: dict = None) -> discord.Embed:
         else:
             embed.set_footer(text=footer_text)
 
-    fields = embed_settings.get("fields", [])
-    if isinstance(fields, list):
-        for field in fields:
-            if not isinstance(field, dict):
-                continue
-            name = _format_text(field.get("name", "-"), context)
-            value = _format_text(field.get("value", "-"), context)
-            inline = bool(field.get("inline", False))
-            embed.add_field(name=name, value=value, inline=inline)
+    for name, value, inline in rendered_fields:
+        embed.add_field(name=name, value=value, inline=inline)
 
     return embed
 
@@ -308,7 +757,7 @@ async def send_channel_embed(
         kwargs["content"] = content
     if allowed_mentions is not None:
         kwargs["allowed_mentions"] = allowed_mentions
-    await channel.send(**kwargs)
+    return await channel.send(**kwargs)
 
 
 async def send_interaction_embed(
@@ -325,61 +774,192 @@ async def send_interaction_embed(
         await interaction.response.send_message(embed=embed, ephemeral=ephemeral, allowed_mentions=allowed_mentions)
 
 
+async def reject_if_shutting_down(interaction: discord.Interaction) -> bool:
+    # No new moves, ingests or writes may start while shutdown drains in-flight work.
+    if not shutting_down:
+        return False
+    increment_stat("interactions_rejected_shutdown")
+    if interaction.type != discord.InteractionType.autocomplete and not interaction.response.is_done():
+        try:
+            await send_interaction_embed(interaction, "bot_restarting", context=build_context(guild=interaction.guild, actor=interaction.user))
+        except discord.HTTPException:
+            pass
+    return True
+
+
 # File-backed ID helpers
+def _parse_id(raw: str):
+    try:
+        raw = raw.strip()
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
 def _read_id(path: str):
     if not os.path.exists(path):
         return None
     try:
         with open(path, "r", encoding="utf-8") as file:
-            raw = file.read().strip()
-        return int(raw) if raw else None
+            return _parse_id(file.read())
     except Exception:
         return None
 
 
-def _write_id(path: str, value: int):
-    with open(path, "w", encoding="utf-8") as file:
-        file.write(str(value))
+def _atomic_write_bytes(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
 
 
-def get_target_channel_id():
-    return _read_id(TARGET_CHANNEL_FILE)
+def _atomic_write_text(path: str, text: str):
+    _atomic_write_bytes(path, text.encode("utf-8"))
 
 
-def set_target_channel_id(channel_id: int):
-    _write_id(TARGET_CHANNEL_FILE, channel_id)
+def _read_json(path: str, default):
+    if not os.path.exists(path):
+        return copy.deepcopy(default)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        return data
+    except Exception:
+        return copy.deepcopy(default)
 
 
-def get_log_channel_id():
-    return _read_id(LOG_CHANNEL_FILE)
+def _serialize_json(payload) -> str:
+    return json.dumps(payload, ensure_ascii=False, indent=2)
 
 
-def set_log_channel_id(channel_id: int):
-    _write_id(LOG_CHANNEL_FILE, channel_id)
+def _write_json(path: str, payload):
+    _atomic_write_text(path, _serialize_json(payload))
 
 
-def get_notify_channel_id():
-    return _read_id(NOTIFY_CHANNEL_FILE)
+# Async persistence layer
+async def run_io(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(PERSISTENCE_EXECUTOR, functools.partial(func, *args))
 
 
-def set_notify_channel_id(channel_id: int):
-    _write_id(NOTIFY_CHANNEL_FILE, channel_id)
+def get_file_update_lock(path: str) -> asyncio.Lock:
+    lock = file_update_locks.get(path)
+    if lock is None:
+        lock = asyncio.Lock()
+        file_update_locks[path] = lock
+    return lock
 
 
-def _read_json(path: str, default):
-    if not os.path.exists(path):
-        return copy.deepcopy(default)
+def _get_write_lock(path: str) -> asyncio.Lock:
+    lock = persistence_write_locks.get(path)
+    if lock is None:
+        lock = asyncio.Lock()
+        persistence_write_locks[path] = lock
+    return lock
+
+
+async def _flush_write(path: str):
+    async with _get_write_lock(path):
+        text = pending_writes.pop(path, None)
+        if text is None:
+            return
+        # Readers see the in-flight text until os.replace returns; disk still has the old contents.
+        inflight_writes[path] = text
+        try:
+            await run_io(_atomic_write_text, path, text)
+            increment_stat("persistence_writes")
+        except Exception as error:
+            increment_stat("persistence_write_errors")
+            logger.error("تعذر حفظ الملف %s: %s", path, error)
+            # Put it back unless something newer was scheduled, so the data is retried rather than lost.
+            pending_writes.setdefault(path, text)
+        finally:
+            inflight_writes.pop(path, None)
+
+
+async def _flush_write_after_delay(path: str):
     try:
-        with open(path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        return data
-    except Exception:
-        return copy.deepcopy(default)
+        while path in pending_writes:
+            await asyncio.sleep(WRITE_COALESCE_SECONDS)
+            await _flush_write(path)
+    finally:
+        pending_write_tasks.pop(path, None)
 
 
-def _write_json(path: str, payload):
-    with open(path, "w", encoding="utf-8") as file:
-        json.dump(payload, file, ensure_ascii=False, indent=2)
+def schedule_write(path: str, text: str):
+    if path in pending_writes:
+        increment_stat("persistence_writes_coalesced")
+    pending_writes[path] = text
+    if path not in pending_write_tasks:
+        pending_write_tasks[path] = asyncio.create_task(_flush_write_after_delay(path))
+
+
+async def flush_pending_writes():
+    await asyncio.gather(*(_flush_write(path) for path in list(pending_writes)))
+
+
+def _buffered_text(path: str):
+    pending = pending_writes.get(path)
+    if pending is None:
+        pending = inflight_writes.get(path)
+    return pending
+
+
+async def read_id_async(path: str):
+    pending = _buffered_text(path)
+    if pending is not None:
+        return _parse_id(pending)
+    return await run_io(_read_id, path)
+
+
+async def read_json_async(path: str, default):
+    pending = _buffered_text(path)
+    if pending is not None:
+        return json.loads(pending)
+    return await run_io(_read_json, path, default)
+
+
+def write_id_deferred(path: str, value: int):
+    schedule_write(path, str(value))
+
+
+def write_json_deferred(path: str, payload):
+    schedule_write(path, _serialize_json(payload))
+
+
+async def get_target_channel_id():
+    return await read_id_async(TARGET_CHANNEL_FILE)
+
+
+def set_target_channel_id(channel_id: int):
+    write_id_deferred(TARGET_CHANNEL_FILE, channel_id)
+
+
+async def get_log_channel_id():
+    return await read_id_async(LOG_CHANNEL_FILE)
+
+
+def set_log_channel_id(channel_id: int):
+    write_id_deferred(LOG_CHANNEL_FILE, channel_id)
+
+
+async def get_notify_channel_id():
+    return await read_id_async(NOTIFY_CHANNEL_FILE)
+
+
+def set_notify_channel_id(channel_id: int):
+    write_id_deferred(NOTIFY_CHANNEL_FILE, channel_id)
 
 
 def _normalize_role_id_list(raw_roles) -> list:
@@ -399,8 +979,8 @@ def _normalize_role_id_list(raw_roles) -> list:
     return normalized
 
 
-def _read_bring_roles_map() -> dict:
-    raw_map = _read_json(BRING_ROLES_FILE, {})
+async def _read_bring_roles_map() -> dict:
+    raw_map = await read_json_async(BRING_ROLES_FILE, {})
     if not isinstance(raw_map, dict):
         return {}
 
@@ -418,16 +998,16 @@ def _write_bring_roles_map(role_map: dict):
         normalized = _normalize_role_id_list(role_ids)
         if normalized:
             cleaned[str(guild_id)] = normalized
-    _write_json(BRING_ROLES_FILE, cleaned)
+    write_json_deferred(BRING_ROLES_FILE, cleaned)
 
 
-def get_allowed_bring_role_ids(guild_id: int) -> list:
-    role_map = _read_bring_roles_map()
+async def get_allowed_bring_role_ids(guild_id: int) -> list:
+    role_map = await _read_bring_roles_map()
     return role_map.get(str(guild_id), [])
 
 
-def set_allowed_bring_role_ids(guild_id: int, role_ids: list):
-    role_map = _read_bring_roles_map()
+async def _set_allowed_bring_role_ids_locked(guild_id: int, role_ids: list):
+    role_map = await _read_bring_roles_map()
     key = str(guild_id)
     normalized = _normalize_role_id_list(role_ids)
     if normalized:
@@ -437,127 +1017,1021 @@ def set_allowed_bring_role_ids(guild_id: int, role_ids: list):
     _write_bring_roles_map(role_map)
 
 
-def add_allowed_bring_role(guild_id: int, role_id: int) -> bool:
-    current = set(get_allowed_bring_role_ids(guild_id))
-    if role_id in current:
-        return False
-    current.add(role_id)
-    set_allowed_bring_role_ids(guild_id, list(current))
-    return True
+async def set_allowed_bring_role_ids(guild_id: int, role_ids: list):
+    async with get_file_update_lock(BRING_ROLES_FILE):
+        await _set_allowed_bring_role_ids_locked(guild_id, role_ids)
 
 
-def remove_allowed_bring_role(guild_id: int, role_id: int) -> bool:
-    current = set(get_allowed_bring_role_ids(guild_id))
-    if role_id not in current:
-        return False
-    current.remove(role_id)
-    set_allowed_bring_role_ids(guild_id, list(current))
-    return True
+async def add_allowed_bring_role(guild_id: int, role_id: int) -> bool:
+    async with get_file_update_lock(BRING_ROLES_FILE):
+        current = set(await get_allowed_bring_role_ids(guild_id))
+        if role_id in current:
+            return False
+        current.add(role_id)
+        await _set_allowed_bring_role_ids_locked(guild_id, list(current))
+        return True
+
+
+async def remove_allowed_bring_role(guild_id: int, role_id: int) -> bool:
+    async with get_file_update_lock(BRING_ROLES_FILE):
+        current = set(await get_allowed_bring_role_ids(guild_id))
+        if role_id not in current:
+            return False
+        current.remove(role_id)
+        await _set_allowed_bring_role_ids_locked(guild_id, list(current))
+        return True
 
 
-def member_can_use_bring_button(member: discord.Member) -> bool:
+async def member_can_use_bring_button(member: discord.Member) -> bool:
     if member.guild_permissions.administrator:
         return True
-    allowed_role_ids = set(get_allowed_bring_role_ids(member.guild.id))
+    allowed_role_ids = set(await get_allowed_bring_role_ids(member.guild.id))
     if not allowed_role_ids:
         return False
     return any(role.id in allowed_role_ids for role in member.roles)
 
 
-def get_guild_voice_lock(guild_id: int) -> asyncio.Lock:
-    lock = guild_voice_locks.get(guild_id)
-    if lock is None:
-        lock = asyncio.Lock()
-        guild_voice_locks[guild_id] = lock
-    return lock
+# Welcome audio clips
+class AudioClipCache:
+    __slots__ = ("max_bytes", "total_bytes", "entries")
 
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
 
-async def send_log(
-    guild: discord.Guild,
-    level: str,
-    event: str,
-    details: str,
-    extra: dict = None,
-    actor=None,
-):
-    normalized_level = _normalize_log_level(level)
-    if not _should_emit_log(normalized_level):
-        return
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
 
-    event_id = uuid.uuid4().hex[:10]
-    clean_details = _shorten_text(details)
-    context = build_context(
-        guild=guild,
-        actor=actor,
-        extra={
-            "event_id": event_id,
-            "event": _shorten_text(event, 250),
-            "details": clean_details,
-            "level": normalized_level,
-            "level_upper": normalized_level.upper(),
-            "level_icon": LOG_LEVEL_ICONS.get(normalized_level, LOG_LEVEL_ICONS[DEFAULT_LOG_LEVEL]),
-            **(extra or {}),
-        },
-    )
+    def discard_path(self, path: str):
+        for stale_key in [cached_key for cached_key in self.entries if cached_key[0] == path]:
+            self.total_bytes -= self.entries.pop(stale_key)[1]
 
-    print(f"[{context['level_upper']}] [{event_id}] {context['event']} | {clean_details}")
+    def put(self, key, frames: tuple):
+        self.discard_path(key[0])
+        size = sum(len(frame) for frame in frames)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (frames, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            increment_stat("audio_cache_evictions")
 
-    channel_id = get_log_channel_id()
-    if not channel_id or guild is None:
-        return
 
-    channel = guild.get_channel(channel_id)
-    if not isinstance(channel, discord.TextChannel):
-        print(f"[WARNING] [{event_id}] قناة السجل غير صالحة أو ليست نصية: {channel_id}")
-        return
+audio_clip_cache = AudioClipCache(AUDIO_CACHE_MAX_BYTES)
 
-    embed_key = LOG_EMBED_KEYS.get(normalized_level, "log_info")
+
+class OpusFrameAudio(discord.AudioSource):
+    def __init__(self, frames: tuple):
+        self._frames = iter(frames)
+
+    def read(self) -> bytes:
+        return next(self._frames, b"")
+
+    def is_opus(self) -> bool:
+        return True
+
+
+def _clip_file_state(path: str):
     try:
-        await send_channel_embed(channel, embed_key, context=context)
-    except Exception as error:
-        print(f"[ERROR] [{event_id}] تعذر إرسال سجل الـ Embed: {error}")
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _opus_frames_path(path: str) -> str:
+    return f"{path}{OPUS_FRAMES_SUFFIX}"
+
+
+def _ingest_clip(source_path: str, frames_path: str, max_seconds: int) -> dict:
+    # Runs in the ingest process pool: normalize, trim and resample once, then store
+    # ready-to-send Opus frames so playback never has to transcode.
+    result = subprocess.run(
+        [
+            # Info level so the input header reports the source duration.
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "info",
+            "-i", source_path,
+            "-af", CLIP_INGEST_FILTERS,
+            "-t", str(max_seconds),
+            "-f", "s16le", "-ar", "48000", "-ac", "2",
+            "pipe:1",
+        ],
+        capture_output=True,
+        timeout=120,
+    )
+    stderr = result.stderr.decode("utf-8", "replace").strip()
+    if result.returncode != 0:
+        raise RuntimeError(stderr.splitlines()[-1] if stderr else f"ffmpeg exited with code {result.returncode}")
+    duration = CLIP_DURATION_PATTERN.search(stderr)
+    source_seconds = int(duration[1]) * 3600 + int(duration[2]) * 60 + float(duration[3]) if duration else None
+
+    pcm = result.stdout
+    if not pcm:
+        raise RuntimeError("The clip is empty after trimming silence.")
+
+    encoder = discord.opus.Encoder()
+    frame_size = discord.opus.Encoder.FRAME_SIZE
+    chunks = [OPUS_FRAMES_MAGIC]
+    frame_count = 0
+    for offset in range(0, len(pcm), frame_size):
+        frame_pcm = pcm[offset:offset + frame_size]
+        if len(frame_pcm) < frame_size:
+            frame_pcm += b"\x00" * (frame_size - len(frame_pcm))
+        frame = encoder.encode(frame_pcm, discord.opus.Encoder.SAMPLES_PER_FRAME)
+        chunks.append(struct.pack(">H", len(frame)))
+        chunks.append(frame)
+        frame_count += 1
+
+    payload = b"".join(chunks)
+    _atomic_write_bytes(frames_path, payload)
+    return {
+        "frames": frame_count,
+        "seconds": frame_count * discord.opus.Encoder.FRAME_LENGTH / 1000,
+        "source_seconds": source_seconds,
+        "bytes": len(payload),
+    }
 
 
-class BringMemberView(discord.ui.View):
-    def __init__(self, member_id: int, source_channel_id: int, request_id: str):
-        super().__init__(timeout=900)
-        self.member_id = member_id
-        self.source_channel_id = source_channel_id
-        self.request_id = request_id
-        bring_button = discord.ui.Button(
-            label=BRING_BUTTON_LABEL,
-            style=discord.ButtonStyle.primary,
-            custom_id=f"bring:{request_id}",
-        )
-        bring_button.callback = self.bring_member
-        self.add_item(bring_button)
+def _read_opus_frames(frames_path: str) -> tuple:
+    with open(frames_path, "rb") as file:
+        payload = file.read()
+    if not payload.startswith(OPUS_FRAMES_MAGIC):
+        raise ValueError(f"{frames_path} is not an Opus frames file.")
 
-    async def bring_member(self, interaction: discord.Interaction):
-        guild = interaction.guild
-        if guild is None:
-            await send_interaction_embed(interaction, "button_server_only", context=build_context(extra={"request_id": self.request_id}))
-            print(f"[WARNING] [bring:{self.request_id}] تم الضغط على زر السحب خارج السيرفر.")
-            return
+    frames = []
+    offset = len(OPUS_FRAMES_MAGIC)
+    while offset + 2 <= len(payload):
+        (length,) = struct.unpack_from(">H", payload, offset)
+        offset += 2
+        frames.append(payload[offset:offset + length])
+        offset += length
+    return tuple(frames)
 
-        clicker = guild.get_member(interaction.user.id)
-        if clicker is None or not member_can_use_bring_button(clicker):
-            await send_interaction_embed(interaction, "button_admin_only", context=build_context(guild=guild, actor=interaction.user, extra={"request_id": self.request_id}))
-            await send_log(
-                guild,
-                "warning",
-                "محاولة سحب بدون صلاحية",
-                "تم الضغط على زر السحب من عضو لا يملك صلاحية الأدمن.",
-                actor=interaction.user,
-                extra={
-                    "request_id": self.request_id,
-                    "command_name": "bring_button",
-                },
-            )
-            return
 
-        if clicker.voice is None or clicker.voice.channel is None:
-            await send_interaction_embed(interaction, "button_join_voice_first", context=build_context(guild=guild, actor=clicker, extra={"request_id": self.request_id}))
-            await send_log(
+def get_ingest_executor() -> ProcessPoolExecutor:
+    global ingest_executor
+    if ingest_executor is None:
+        # Spawned, not forked: by now the persistence, audio and audit threads exist.
+        ingest_executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return ingest_executor
+
+
+async def ingest_clip(path: str) -> dict:
+    started_at = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    stats = await loop.run_in_executor(get_ingest_executor(), _ingest_clip, path, _opus_frames_path(path), MAX_CLIP_SECONDS)
+    record_timing("clip_ingest_ms", (time.perf_counter() - started_at) * 1000)
+    audio_clip_cache.discard_path(os.path.abspath(path))
+    return stats
+
+
+def _opus_frames_are_fresh(path: str) -> bool:
+    source_state = _clip_file_state(path)
+    frames_state = _clip_file_state(_opus_frames_path(path))
+    return source_state is not None and frames_state is not None and frames_state[0] >= source_state[0]
+
+
+async def _load_and_cache_clip(key: tuple, path: str) -> tuple:
+    if not await run_io(_opus_frames_are_fresh, path):
+        await ingest_clip(path)
+    loop = asyncio.get_running_loop()
+    frames = await loop.run_in_executor(AUDIO_EXECUTOR, _read_opus_frames, _opus_frames_path(path))
+    audio_clip_cache.put(key, frames)
+    return frames
+
+
+async def load_clip_frames(path: str):
+    file_state = await run_io(_clip_file_state, path)
+    if file_state is None:
+        return None
+
+    key = (os.path.abspath(path), file_state[0])
+    frames = audio_clip_cache.get(key)
+    if frames is not None:
+        increment_stat("audio_cache_hits")
+        return frames
+
+    load_task = audio_load_tasks.get(key)
+    if load_task is None:
+        increment_stat("audio_cache_misses")
+        load_task = asyncio.ensure_future(_load_and_cache_clip(key, path))
+        audio_load_tasks[key] = load_task
+        load_task.add_done_callback(lambda _: audio_load_tasks.pop(key, None))
+    return await asyncio.shield(load_task)
+
+
+async def _read_welcome_clips_map() -> dict:
+    clip_map = await read_json_async(WELCOME_CLIPS_FILE, {})
+    if not isinstance(clip_map, dict):
+        return {}
+    return {
+        str(guild_id): guild_clips
+        for guild_id, guild_clips in clip_map.items()
+        if isinstance(guild_clips, dict)
+    }
+
+
+async def get_welcome_clip_path(guild_id: int, channel_id: int = None) -> str:
+    guild_clips = (await _read_welcome_clips_map()).get(str(guild_id), {})
+    if channel_id is not None and guild_clips.get(str(channel_id)):
+        return guild_clips[str(channel_id)]
+    return guild_clips.get("default") or WELCOME_AUDIO_PATH
+
+
+async def set_welcome_clip(guild_id: int, scope: str, path: str = None):
+    async with get_file_update_lock(WELCOME_CLIPS_FILE):
+        clip_map = await _read_welcome_clips_map()
+        guild_clips = dict(clip_map.get(str(guild_id), {}))
+        previous = guild_clips.pop(scope, None)
+        if path:
+            guild_clips[scope] = path
+        if guild_clips:
+            clip_map[str(guild_id)] = guild_clips
+        else:
+            clip_map.pop(str(guild_id), None)
+        write_json_deferred(WELCOME_CLIPS_FILE, clip_map)
+        return previous
+
+
+def _remove_clip_file(path: str):
+    if os.path.commonpath([os.path.abspath(path), os.path.abspath(CLIPS_DIR)]) != os.path.abspath(CLIPS_DIR):
+        return
+    for stale_path in (path, _opus_frames_path(path)):
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+
+# Per-guild runtime state
+class GuildState:
+    __slots__ = (
+        "guild_id", "last_seen", "voice_lock", "voice_active_at", "voice_connected_at",
+        "log_breaker", "notify_breaker", "notifications", "identity",
+    )
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.last_seen = time.monotonic()
+        self.voice_lock = None
+        self.voice_active_at = None
+        self.voice_connected_at = None
+        self.log_breaker = None
+        self.notify_breaker = None
+        # message_id -> (member_id, source_channel_id, request_id, expires_at)
+        self.notifications = None
+        self.identity = None
+
+    def track_notification(self, message_id: int, member_id: int, source_channel_id: int, request_id: str, expires_at: float):
+        if self.notifications is None:
+            self.notifications = {}
+        else:
+            self.prune_notifications()
+        self.notifications[message_id] = (member_id, source_channel_id, request_id, expires_at)
+
+    def prune_notifications(self):
+        now = time.time()
+        expired = [message_id for message_id, entry in self.notifications.items() if entry[3] <= now]
+        for message_id in expired:
+            del self.notifications[message_id]
+
+    def is_busy(self) -> bool:
+        if self.voice_lock is not None and self.voice_lock.locked():
+            return True
+        if self.voice_active_at is not None:
+            return True
+        if self.notifications:
+            self.prune_notifications()
+            if self.notifications:
+                return True
+        return any(breaker is not None and breaker.is_open for breaker in (self.log_breaker, self.notify_breaker))
+
+
+class GuildStateRegistry:
+    __slots__ = ("states", "max_guilds", "idle_seconds", "evictions")
+
+    def __init__(self, max_guilds: int, idle_seconds: float):
+        self.states = OrderedDict()
+        self.max_guilds = max_guilds
+        self.idle_seconds = idle_seconds
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def get(self, guild_id: int) -> GuildState:
+        state = self.states.get(guild_id)
+        if state is None:
+            self.evict_idle()
+            state = GuildState(guild_id)
+            self.states[guild_id] = state
+            if len(self.states) > self.max_guilds:
+                self._evict_oldest()
+        else:
+            state.last_seen = time.monotonic()
+            self.states.move_to_end(guild_id)
+        return state
+
+    def peek(self, guild_id: int):
+        return self.states.get(guild_id)
+
+    def _evict_oldest(self):
+        for guild_id, state in self.states.items():
+            if not state.is_busy():
+                del self.states[guild_id]
+                self.evictions += 1
+                return
+
+    def evict_idle(self) -> int:
+        # Oldest first; stop at the first guild seen inside the idle window.
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = []
+        for guild_id, state in self.states.items():
+            if state.last_seen > cutoff:
+                break
+            if not state.is_busy():
+                idle.append(guild_id)
+        for guild_id in idle:
+            del self.states[guild_id]
+        self.evictions += len(idle)
+        return len(idle)
+
+
+guild_states = GuildStateRegistry(GUILD_STATE_MAX, GUILD_STATE_IDLE_SECONDS)
+
+
+# Voice connections
+class VoiceConnectionManager:
+    __slots__ = ("reconnects", "idle_disconnects")
+
+    def __init__(self):
+        self.reconnects = 0
+        self.idle_disconnects = 0
+
+    def touch(self, guild_id: int):
+        guild_states.get(guild_id).voice_active_at = time.monotonic()
+
+    def forget(self, guild_id: int):
+        state = guild_states.peek(guild_id)
+        if state is not None:
+            state.voice_active_at = None
+            state.voice_connected_at = None
+
+    def tracked(self) -> list:
+        return [state.guild_id for state in guild_states.states.values() if state.voice_active_at is not None]
+
+    def counts(self) -> dict:
+        connected = sum(1 for vc in bot.voice_clients if vc.is_connected())
+        return {
+            "voice_connected": connected,
+            "voice_tracked": len(self.tracked()),
+            "voice_reconnects": self.reconnects,
+            "voice_idle_disconnects": self.idle_disconnects,
+        }
+
+    def publish_gauges(self):
+        for name, value in self.counts().items():
+            set_gauge(name, value)
+
+    async def _connect_with_backoff(self, channel) -> discord.VoiceClient:
+        delay = VOICE_RECONNECT_BASE_DELAY
+        for attempt in range(1, VOICE_CONNECT_ATTEMPTS + 1):
+            try:
+                vc = await channel.connect(timeout=VOICE_CONNECT_TIMEOUT)
+                state = guild_states.get(channel.guild.id)
+                state.voice_connected_at = state.voice_active_at = time.monotonic()
+                return vc
+            except Exception:
+                if attempt == VOICE_CONNECT_ATTEMPTS:
+                    raise
+                stale = channel.guild.voice_client
+                if stale is not None:
+                    await stale.disconnect(force=True)
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def ensure_connected(self, guild: discord.Guild, channel) -> discord.VoiceClient:
+        # Caller must hold get_guild_voice_lock(guild.id).
+        vc = guild.voice_client
+        if vc is None:
+            return await self._connect_with_backoff(channel)
+        if vc.channel is None or vc.channel.id != channel.id:
+            await vc.move_to(channel)
+        self.touch(guild.id)
+        return vc
+
+    async def disconnect(self, guild: discord.Guild, force: bool = False) -> bool:
+        self.forget(guild.id)
+        vc = guild.voice_client
+        if vc is None:
+            return False
+        await vc.disconnect(force=force)
+        return True
+
+    def _is_unhealthy(self, vc: discord.VoiceClient, state: GuildState) -> bool:
+        if time.monotonic() - state.voice_connected_at < VOICE_HEALTH_GRACE:
+            return False
+        return not vc.is_connected() or vc.latency > VOICE_MAX_HEARTBEAT_LATENCY
+
+    async def _check_guild(self, guild: discord.Guild):
+        async with get_guild_voice_lock(guild.id):
+            vc = guild.voice_client
+            if vc is None:
+                self.forget(guild.id)
+                return
+            state = guild_states.get(guild.id)
+            now = time.monotonic()
+            if state.voice_connected_at is None:
+                state.voice_connected_at = now
+            if vc.is_playing():
+                state.voice_active_at = now
+                return
+            if state.voice_active_at is None:
+                state.voice_active_at = now
+
+            idle_for = now - state.voice_active_at
+            if VOICE_IDLE_TIMEOUT > 0 and idle_for >= VOICE_IDLE_TIMEOUT:
+                self.idle_disconnects += 1
+                await self.disconnect(guild)
+                logger.info("تم فصل الاتصال الصوتي الخامل في %s بعد %.0f ثانية.", guild.name, idle_for)
+                return
+
+            if self._is_unhealthy(vc, state):
+                channel = vc.channel
+                logger.warning("الاتصال الصوتي في %s غير سليم (latency=%s)، تتم إعادة الاتصال.", guild.name, vc.latency)
+                await self.disconnect(guild, force=True)
+                if channel is not None:
+                    self.reconnects += 1
+                    await self._connect_with_backoff(channel)
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(VOICE_WATCHDOG_INTERVAL)
+            guilds = [vc.guild for vc in bot.voice_clients if isinstance(vc, discord.VoiceClient)]
+            for guild_id in set(self.tracked()) - {guild.id for guild in guilds}:
+                self.forget(guild_id)
+            guild_states.evict_idle()
+            results = await fan_out(guilds, self._check_guild, VOICE_WATCHDOG_CONCURRENCY)
+            for guild, result in zip(guilds, results):
+                if isinstance(result, Exception):
+                    logger.error("فشل فحص الاتصال الصوتي في %s: %s", guild.name, result)
+            self.publish_gauges()
+            set_gauge("guild_states", len(guild_states))
+            set_gauge("guild_state_evictions", guild_states.evictions)
+
+
+voice_manager = VoiceConnectionManager()
+voice_watchdog_task = None
+
+
+# Runtime stats
+def increment_stat(name: str, amount: int = 1):
+    counters = BOT_STATS["counters"]
+    counters[name] = counters.get(name, 0) + amount
+
+
+def record_timing(name: str, elapsed_ms: float):
+    timing = BOT_STATS["timings"].get(name)
+    if timing is None:
+        timing = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+        BOT_STATS["timings"][name] = timing
+    timing["count"] += 1
+    timing["total_ms"] += elapsed_ms
+    timing["max_ms"] = max(timing["max_ms"], elapsed_ms)
+    timing["last_ms"] = elapsed_ms
+
+
+def set_gauge(name: str, value):
+    BOT_STATS["gauges"][name] = value
+
+
+def format_stats() -> str:
+    lines = []
+    for name, value in sorted(BOT_STATS["counters"].items()):
+        lines.append(f"- `{name}`: {value}")
+    for name, value in sorted(BOT_STATS["gauges"].items()):
+        lines.append(f"- `{name}`: {value}")
+    for name, timing in sorted(BOT_STATS["timings"].items()):
+        average = timing["total_ms"] / timing["count"] if timing["count"] else 0.0
+        lines.append(
+            f"- `{name}`: avg {average:.1f} | max {timing['max_ms']:.1f} | last {timing['last_ms']:.1f} (n={timing['count']})"
+        )
+    return "\n".join(lines) if lines else "No stats recorded yet."
+
+
+def _on_background_task_done(task: asyncio.Task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("فشلت مهمة في الخلفية: %s", task.exception())
+
+
+def spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+
+def get_guild_voice_lock(guild_id: int) -> asyncio.Lock:
+    state = guild_states.get(guild_id)
+    if state.voice_lock is None:
+        state.voice_lock = asyncio.Lock()
+    return state.voice_lock
+
+
+# Delivery circuit breakers
+class CircuitBreaker:
+    __slots__ = ("failures", "is_open", "next_probe_at", "probe_delay")
+
+    def __init__(self):
+        self.failures = 0
+        self.is_open = False
+        self.next_probe_at = 0.0
+        self.probe_delay = CIRCUIT_PROBE_INTERVAL
+
+    def allow(self) -> bool:
+        if not self.is_open:
+            return True
+        now = time.monotonic()
+        if now < self.next_probe_at:
+            return False
+        # Half-open: let this one attempt through and push the next probe out.
+        self.next_probe_at = now + self.probe_delay
+        return True
+
+    def record_success(self) -> bool:
+        was_open = self.is_open
+        self.failures = 0
+        self.is_open = False
+        self.probe_delay = CIRCUIT_PROBE_INTERVAL
+        return was_open
+
+    def record_failure(self) -> bool:
+        self.failures += 1
+        if self.is_open:
+            self.probe_delay = min(self.probe_delay * 2, CIRCUIT_MAX_PROBE_INTERVAL)
+            self.next_probe_at = time.monotonic() + self.probe_delay
+            return False
+        if self.failures < CIRCUIT_FAILURE_THRESHOLD:
+            return False
+        self.is_open = True
+        self.next_probe_at = time.monotonic() + self.probe_delay
+        return True
+
+
+def get_delivery_breaker(guild_id: int, kind: str) -> CircuitBreaker:
+    state = guild_states.get(guild_id)
+    attr = f"{kind}_breaker"
+    breaker = getattr(state, attr)
+    if breaker is None:
+        breaker = CircuitBreaker()
+        setattr(state, attr, breaker)
+    return breaker
+
+
+def _record_delivery_failure(guild: discord.Guild, kind: str, breaker: CircuitBreaker, reason):
+    increment_stat(f"{kind}_delivery_failures")
+    if not breaker.record_failure():
+        return
+    increment_stat(f"{kind}_circuit_opened")
+    logger.warning(
+        "تم إيقاف إرسال %s مؤقتاً في %s (%s) بعد %s محاولات فاشلة: %s",
+        kind, guild.name, guild.id, breaker.failures, reason,
+    )
+    if kind == "notify":
+        spawn_background(send_log(
+            guild,
+            "error",
+            "تم إيقاف تنبيهات الانضمام مؤقتاً",
+            f"فشل إرسال تنبيهات الانضمام {breaker.failures} مرات متتالية، ستتم إعادة المحاولة تلقائياً.",
+            extra={"command_name": "voice_join_notify", "error_text": _shorten_text(reason, 400)},
+        ))
+    elif event_journal.accepts(LOG_LEVEL_PRIORITIES["error"]):
+        event_journal.record(_journal_entry(
+            uuid.uuid4().hex[:10], "error", "تم إيقاف إرسال السجلات مؤقتاً", str(reason), guild, None,
+            {"command_name": "send_log", "error_text": _shorten_text(reason, 400)}, None,
+        ))
+
+
+def _record_delivery_success(guild: discord.Guild, kind: str, breaker: CircuitBreaker):
+    if breaker.record_success():
+        increment_stat(f"{kind}_circuit_closed")
+        logger.info("عاد إرسال %s للعمل في %s (%s).", kind, guild.name, guild.id)
+
+
+# Event journal
+class EventJournal:
+    __slots__ = ("path", "buffer", "min_priority", "opened_at", "wakeup", "write_lock")
+
+    def __init__(self, path: str, min_level: str):
+        self.path = path
+        self.buffer = deque()
+        self.min_priority = LOG_LEVEL_PRIORITIES[_normalize_log_level(min_level)]
+        self.opened_at = None
+        self.wakeup = None
+        self.write_lock = None
+
+    def accepts(self, priority: int) -> bool:
+        return JOURNAL_ENABLED and priority >= self.min_priority
+
+    def record(self, entry: dict):
+        if len(self.buffer) >= JOURNAL_MAX_BUFFER:
+            self.buffer.popleft()
+            increment_stat("journal_dropped")
+        self.buffer.append(entry)
+        if len(self.buffer) >= JOURNAL_BATCH_SIZE and self.wakeup is not None:
+            self.wakeup.set()
+
+    def _rotated_path(self) -> str:
+        base, extension = os.path.splitext(self.path)
+        now_ns = time.time_ns()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(now_ns / 1e9))
+        return f"{base}-{stamp}-{now_ns % 1_000_000_000:09d}{extension}"
+
+    def _prune_backups(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        base = os.path.splitext(os.path.basename(self.path))[0]
+        backups = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(f"{base}-") and name != os.path.basename(self.path)
+        )
+        for name in backups[:max(len(backups) - JOURNAL_BACKUPS, 0)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    def _rotate(self):
+        rotated_path = self._rotated_path()
+        os.replace(self.path, rotated_path)
+        if JOURNAL_GZIP:
+            with open(rotated_path, "rb") as source, gzip.open(f"{rotated_path}.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated_path)
+        self._prune_backups()
+
+    def _file_started_at(self) -> float:
+        # The first entry's timestamp, so restarts do not reset the rotation age.
+        # mtime alone is not enough: every append moves it forward.
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                first_line = file.readline()
+            return datetime.fromisoformat(json.loads(first_line)["ts"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return os.path.getmtime(self.path)
+
+    def _write_entries(self, entries: list) -> bool:
+        # Runs on the persistence thread; stats are updated by flush() on the loop.
+        rotated = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        now = time.time()
+        if self.opened_at is None:
+            self.opened_at = self._file_started_at() if os.path.exists(self.path) else now
+        if os.path.exists(self.path):
+            too_big = os.path.getsize(self.path) >= JOURNAL_MAX_BYTES
+            too_old = JOURNAL_ROTATE_SECONDS > 0 and now - self.opened_at >= JOURNAL_ROTATE_SECONDS
+            if too_big or too_old:
+                self._rotate()
+                self.opened_at = now
+                rotated = True
+
+        payload = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(payload)
+        return rotated
+
+    async def flush(self):
+        if self.write_lock is None:
+            self.write_lock = asyncio.Lock()
+        async with self.write_lock:
+            if not self.buffer:
+                return
+            entries = list(self.buffer)
+            self.buffer.clear()
+            try:
+                rotated = await run_io(self._write_entries, entries)
+                increment_stat("journal_events_written", len(entries))
+                if rotated:
+                    increment_stat("journal_rotations")
+            except Exception as error:
+                increment_stat("journal_write_errors")
+                logger.error("تعذر كتابة سجل الأحداث %s: %s", self.path, error)
+
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), JOURNAL_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+
+event_journal = EventJournal(JOURNAL_PATH, JOURNAL_MIN_LEVEL)
+journal_task = None
+
+
+# Audit store
+AUDIT_COMMANDS = (
+    "bring_button", "bringall", "bringselect", "voice_join_notify",
+    "setchannel", "setlogchannel", "setnotifychannel",
+    "addbringrole", "removebringrole", "clearbringroles",
+    "setwelcomeclip", "clearwelcomeclip", "togglebot",
+)
+AUDIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    guild_id INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    actor_id INTEGER,
+    target_id INTEGER,
+    request_id TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS audit_guild_ts ON audit (guild_id, ts);
+CREATE INDEX IF NOT EXISTS audit_guild_actor_ts ON audit (guild_id, actor_id, ts);
+CREATE INDEX IF NOT EXISTS audit_guild_target_ts ON audit (guild_id, target_id, ts);
+CREATE INDEX IF NOT EXISTS audit_guild_command_ts ON audit (guild_id, command, ts);
+"""
+
+
+class AuditStore:
+    # SQLite connection lives on one dedicated thread; the loop only appends to `pending`.
+    __slots__ = ("path", "executor", "connection", "pending", "flush_task")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit")
+        self.connection = None
+        self.pending = []
+        self.flush_task = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(AUDIT_SCHEMA)
+            if AUDIT_RETENTION_DAYS > 0:
+                connection.execute("DELETE FROM audit WHERE ts < ?", (time.time() - AUDIT_RETENTION_DAYS * 86400,))
+            connection.commit()
+            self.connection = connection
+        return self.connection
+
+    def _insert(self, rows: list):
+        connection = self._connect()
+        connection.executemany(
+            "INSERT INTO audit (ts, guild_id, command, actor_id, target_id, request_id, details) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        connection.commit()
+
+    def _select(self, guild_id: int, user_id, command, since, until, limit: int, offset: int) -> list:
+        clauses = ["guild_id = ?"]
+        params = [guild_id]
+        if command is not None:
+            # With a user filter the unary + keeps SQLite on the actor/target indexes.
+            clauses.append("+command = ?" if user_id is not None else "command = ?")
+            params.append(command)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        select = f"SELECT id, ts, command, actor_id, target_id, request_id, details FROM audit WHERE {' AND '.join(clauses)}"
+        if user_id is None:
+            sql = select
+        else:
+            # One indexed select per side; "actor_id = ? OR target_id = ?" makes SQLite walk the whole guild.
+            sql = f"{select} AND actor_id = ? UNION {select} AND target_id = ?"
+            params = params + [user_id] + params + [user_id]
+        rows = self._connect().execute(f"{sql} ORDER BY ts DESC LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        return [row[1:] for row in rows]
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    def record(self, guild_id: int, command: str, actor_id=None, target_id=None, request_id=None, details: str = ""):
+        self.pending.append((time.time(), guild_id, command, actor_id, target_id, request_id, _shorten_text(details, 500)))
+        if self.flush_task is None:
+            self.flush_task = spawn_background(self._flush_after_delay())
+
+    async def _flush_after_delay(self):
+        try:
+            await asyncio.sleep(AUDIT_FLUSH_DELAY)
+        finally:
+            self.flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        try:
+            await self._run(self._insert, rows)
+            increment_stat("audit_records", len(rows))
+        except Exception as error:
+            increment_stat("audit_write_errors")
+            logger.error("تعذر حفظ سجل التدقيق %s: %s", self.path, error)
+
+    async def query(self, guild_id: int, user_id=None, command=None, since=None, until=None, limit: int = AUDIT_PAGE_SIZE, offset: int = 0) -> list:
+        await self.flush()
+        started_at = time.perf_counter()
+        rows = await self._run(self._select, guild_id, user_id, command, since, until, limit, offset)
+        record_timing("audit_query_ms", (time.perf_counter() - started_at) * 1000)
+        return rows
+
+
+audit_store = AuditStore(AUDIT_DB_PATH)
+
+
+def record_audit(guild: discord.Guild, command: str, actor=None, target_id=None, request_id=None, details: str = ""):
+    if guild is None:
+        return
+    audit_store.record(guild.id, command, getattr(actor, "id", None), target_id, request_id, details)
+
+
+def _journal_entry(event_id: str, level: str, event: str, details: str, guild, actor, extra: dict, timings: dict) -> dict:
+    extra = extra or {}
+    return {
+        "ts": discord.utils.utcnow().isoformat(),
+        "event_id": event_id,
+        "request_id": extra.get("request_id"),
+        "level": level,
+        "event": event,
+        "details": details,
+        "command": extra.get("command_name"),
+        "guild_id": guild.id if guild else None,
+        "guild_name": guild.name if guild else None,
+        "actor_id": getattr(actor, "id", None),
+        "actor": str(actor) if actor else None,
+        "target_id": extra.get("target_id"),
+        "error": extra.get("error_text"),
+        "timings": timings,
+    }
+
+
+async def send_log(
+    guild: discord.Guild,
+    level: str,
+    event: str,
+    details,
+    extra=None,
+    actor=None,
+    timings: dict = None,
+):
+    # details and extra may be zero-argument callables so that callers on hot paths
+    # only pay for building them when the event passes the level threshold.
+    priority = LOG_LEVEL_PRIORITIES.get(level)
+    if priority is None:
+        level = _normalize_log_level(level)
+        priority = LOG_LEVEL_PRIORITIES[level]
+    if priority < send_log_threshold:
+        return
+
+    normalized_level = level
+    should_emit = priority >= log_threshold
+    should_journal = event_journal.accepts(priority)
+    if callable(details):
+        details = details()
+    if callable(extra):
+        extra = extra()
+
+    event_id = uuid.uuid4().hex[:10]
+    clean_details = _shorten_text(details)
+    if should_journal:
+        event_journal.record(_journal_entry(event_id, normalized_level, event, clean_details, guild, actor, extra, timings))
+    if not should_emit:
+        return
+
+    logger.log(priority, "[%s] %s | %s", event_id, event, clean_details)
+
+    if guild is None:
+        return
+    channel_id = await get_log_channel_id()
+    if not channel_id:
+        return
+
+    breaker = get_delivery_breaker(guild.id, "log")
+    if not breaker.allow():
+        increment_stat("log_delivery_skipped")
+        return
+
+    channel = guild.get_channel(channel_id)
+    if not isinstance(channel, discord.TextChannel):
+        logger.warning("[%s] قناة السجل غير صالحة أو ليست نصية: %s", event_id, channel_id)
+        _record_delivery_failure(guild, "log", breaker, f"invalid log channel {channel_id}")
+        return
+
+    context = build_context(
+        guild=guild,
+        actor=actor,
+        extra={
+            "event_id": event_id,
+            "event": _shorten_text(event, 250),
+            "details": clean_details,
+            "level": normalized_level,
+            "level_upper": normalized_level.upper(),
+            "level_icon": LOG_LEVEL_ICONS.get(normalized_level, LOG_LEVEL_ICONS[DEFAULT_LOG_LEVEL]),
+            **(extra or {}),
+        },
+    )
+    embed_key = LOG_EMBED_KEYS.get(normalized_level, "log_info")
+    try:
+        await send_channel_embed(channel, embed_key, context=context)
+    except Exception as error:
+        logger.error("[%s] تعذر إرسال سجل الـ Embed: %s", event_id, error)
+        _record_delivery_failure(guild, "log", breaker, error)
+        return
+    _record_delivery_success(guild, "log", breaker)
+
+
+async def resolve_member(guild: discord.Guild, user_id: int):
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    increment_stat("member_cache_misses")
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+    except discord.HTTPException as error:
+        logger.warning("تعذر جلب العضو %s من %s: %s", user_id, guild.id, error)
+        return None
+
+
+async def resolve_interaction_member(interaction: discord.Interaction):
+    if isinstance(interaction.user, discord.Member):
+        return interaction.user
+    return await resolve_member(interaction.guild, interaction.user.id)
+
+
+class BringMemberView(discord.ui.View):
+    def __init__(self, member_id: int, source_channel_id: int, request_id: str, timeout: float = BRING_VIEW_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.member_id = member_id
+        self.source_channel_id = source_channel_id
+        self.request_id = request_id
+        bring_button = discord.ui.Button(
+            label=BRING_BUTTON_LABEL,
+            style=discord.ButtonStyle.primary,
+            custom_id=f"bring:{request_id}",
+        )
+        bring_button.callback = self.bring_member
+        self.add_item(bring_button)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return not await reject_if_shutting_down(interaction)
+
+    async def bring_member(self, interaction: discord.Interaction):
+        started_at = time.perf_counter()
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+        except discord.HTTPException as error:
+            logger.error("[bring:%s] تعذر تأجيل الرد على زر السحب: %s", self.request_id, error)
+            increment_stat("bring_button_ack_failed")
+            return
+        ack_ms = (time.perf_counter() - started_at) * 1000
+        record_timing("bring_button_ack_ms", ack_ms)
+        record_timing("bring_button_gateway_to_ack_ms", (discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000)
+
+        guild = interaction.guild
+        if guild is None:
+            await send_interaction_embed(interaction, "button_server_only", context=build_context(extra={"request_id": self.request_id}))
+            logger.warning("[bring:%s] تم الضغط على زر السحب خارج السيرفر.", self.request_id)
+            return
+
+        clicker = await resolve_interaction_member(interaction)
+        if clicker is None or not await member_can_use_bring_button(clicker):
+            await send_interaction_embed(interaction, "button_admin_only", context=build_context(guild=guild, actor=interaction.user, extra={"request_id": self.request_id}))
+            spawn_background(send_log(
+                guild,
+                "warning",
+                "محاولة سحب بدون صلاحية",
+                "تم الضغط على زر السحب من عضو لا يملك صلاحية الأدمن.",
+                actor=interaction.user,
+                extra={
+                    "request_id": self.request_id,
+                    "command_name": "bring_button",
+                },
+            ))
+            return
+
+        if clicker.voice is None or clicker.voice.channel is None:
+            await send_interaction_embed(interaction, "button_join_voice_first", context=build_context(guild=guild, actor=clicker, extra={"request_id": self.request_id}))
+            spawn_background(send_log(
                 guild,
                 "warning",
                 "محاولة سحب بدون روم صوتي",
@@ -567,13 +2041,13 @@ class BringMemberView(discord.ui.View):
                     "request_id": self.request_id,
                     "command_name": "bring_button",
                 },
-            )
+            ))
             return
 
-        target_member = guild.get_member(self.member_id)
+        target_member = await resolve_member(guild, self.member_id)
         if target_member is None:
             await send_interaction_embed(interaction, "button_target_not_found", context=build_context(guild=guild, actor=clicker, extra={"request_id": self.request_id}))
-            await send_log(
+            spawn_background(send_log(
                 guild,
                 "warning",
                 "المستخدم الهدف غير موجود",
@@ -584,7 +2058,7 @@ class BringMemberView(discord.ui.View):
                     "command_name": "bring_button",
                     "target_id": str(self.member_id),
                 },
-            )
+            ))
             return
 
         if target_member.voice is None or target_member.voice.channel is None:
@@ -601,7 +2075,7 @@ class BringMemberView(discord.ui.View):
                     },
                 ),
             )
-            await send_log(
+            spawn_background(send_log(
                 guild,
                 "warning",
                 "المستخدم الهدف غادر الروم",
@@ -614,7 +2088,7 @@ class BringMemberView(discord.ui.View):
                     "target_display_name": target_member.display_name,
                     "target_id": str(target_member.id),
                 },
-            )
+            ))
             return
 
         if target_member.voice.channel.id != self.source_channel_id:
@@ -631,7 +2105,7 @@ class BringMemberView(discord.ui.View):
                     },
                 ),
             )
-            await send_log(
+            spawn_background(send_log(
                 guild,
                 "warning",
                 "المستخدم ليس في الروم المحدد",
@@ -645,41 +2119,13 @@ class BringMemberView(discord.ui.View):
                     "target_id": str(target_member.id),
                     **_channel_context(target_member.voice.channel, "voice"),
                 },
-            )
+            ))
             return
 
+        destination = clicker.voice.channel
+        move_started_at = time.perf_counter()
         try:
-            await target_member.move_to(clicker.voice.channel, reason=f"طلب سحب بواسطة {clicker}")
-            await send_interaction_embed(
-                interaction,
-                "button_move_success",
-                context=build_context(
-                    guild=guild,
-                    actor=clicker,
-                    extra={
-                        "request_id": self.request_id,
-                        "target_mention": target_member.mention,
-                        "target_display_name": target_member.display_name,
-                        "destination_channel_mention": clicker.voice.channel.mention,
-                        "destination_channel_name": clicker.voice.channel.name,
-                    },
-                ),
-            )
-            await send_log(
-                guild,
-                "info",
-                "تم سحب المستخدم",
-                f"{clicker.display_name} قام بسحب {target_member.display_name} إلى {clicker.voice.channel.name} (طلب {self.request_id}).",
-                actor=clicker,
-                extra={
-                    "request_id": self.request_id,
-                    "command_name": "bring_button",
-                    "target_mention": target_member.mention,
-                    "target_display_name": target_member.display_name,
-                    "target_id": str(target_member.id),
-                    **_channel_context(clicker.voice.channel, "destination"),
-                },
-            )
+            await target_member.move_to(destination, reason=f"طلب سحب بواسطة {clicker}")
         except discord.Forbidden:
             await send_interaction_embed(
                 interaction,
@@ -694,7 +2140,7 @@ class BringMemberView(discord.ui.View):
                     },
                 ),
             )
-            await send_log(
+            spawn_background(send_log(
                 guild,
                 "error",
                 "فشل السحب بسبب الصلاحيات",
@@ -706,9 +2152,10 @@ class BringMemberView(discord.ui.View):
                     "target_mention": target_member.mention,
                     "target_display_name": target_member.display_name,
                     "target_id": str(target_member.id),
-                    **_channel_context(clicker.voice.channel, "destination"),
+                    **_channel_context(destination, "destination"),
                 },
-            )
+            ))
+            return
         except Exception as error:
             await send_interaction_embed(
                 interaction,
@@ -724,7 +2171,7 @@ class BringMemberView(discord.ui.View):
                     },
                 ),
             )
-            await send_log(
+            spawn_background(send_log(
                 guild,
                 "error",
                 "فشل تنفيذ السحب",
@@ -737,18 +2184,258 @@ class BringMemberView(discord.ui.View):
                     "target_display_name": target_member.display_name,
                     "target_id": str(target_member.id),
                     "error_text": _shorten_text(error, 400),
-                    **_channel_context(clicker.voice.channel, "destination"),
+                    **_channel_context(destination, "destination"),
                 },
-            )
+            ))
+            return
+
+        move_ms = (time.perf_counter() - move_started_at) * 1000
+        record_timing("bring_move_ms", move_ms)
+        record_audit(guild, "bring_button", clicker, target_member.id, self.request_id, f"-> {destination.name}")
+        await send_interaction_embed(
+            interaction,
+            "button_move_success",
+            context=build_context(
+                guild=guild,
+                actor=clicker,
+                extra={
+                    "request_id": self.request_id,
+                    "target_mention": target_member.mention,
+                    "target_display_name": target_member.display_name,
+                    "destination_channel_mention": destination.mention,
+                    "destination_channel_name": destination.name,
+                },
+            ),
+        )
+        if log_enabled("info"):
+            spawn_background(send_log(
+                guild,
+                "info",
+                "تم سحب المستخدم",
+                lambda: f"{clicker.display_name} قام بسحب {target_member.display_name} إلى {destination.name} (طلب {self.request_id}، التأكيد خلال {ack_ms:.0f}ms).",
+                actor=clicker,
+                extra=lambda: {
+                    "request_id": self.request_id,
+                    "command_name": "bring_button",
+                    "target_mention": target_member.mention,
+                    "target_display_name": target_member.display_name,
+                    "target_id": str(target_member.id),
+                    **_channel_context(destination, "destination"),
+                },
+                timings={"ack_ms": round(ack_ms, 1), "move_ms": round(move_ms, 1)},
+            ))
+
+
+async def _move_member_bounded(semaphore: asyncio.Semaphore, member: discord.Member, destination, reason: str):
+    async with semaphore:
+        try:
+            await member.move_to(destination, reason=reason)
+            return member, None
+        except Exception as error:
+            return member, error
+
+
+async def move_members_concurrently(members: list, destination, reason: str) -> dict:
+    semaphore = asyncio.Semaphore(max(BRING_ALL_CONCURRENCY, 1))
+    results = await asyncio.gather(
+        *(_move_member_bounded(semaphore, member, destination, reason) for member in members)
+    )
+    summary = {"moved": [], "forbidden": [], "failed": []}
+    for member, error in results:
+        if error is None:
+            summary["moved"].append(member)
+        elif isinstance(error, discord.Forbidden):
+            summary["forbidden"].append(member)
+        else:
+            summary["failed"].append((member, error))
+    return summary
+
+
+def _members_in_monitored_channel(guild: discord.Guild, source_channel_id: int, member_ids=None, exclude_id: int = None) -> tuple:
+    source_channel = guild.get_channel(source_channel_id) if source_channel_id else None
+    if not isinstance(source_channel, (discord.VoiceChannel, discord.StageChannel)):
+        return None, [], 0
+
+    if member_ids is None:
+        members = [member for member in source_channel.members if not member.bot and member.id != exclude_id]
+        return source_channel, members, 0
+
+    members = []
+    skipped = 0
+    for member_id in member_ids:
+        if member_id == exclude_id:
+            continue
+        member = guild.get_member(member_id)
+        if member is None or member.voice is None or member.voice.channel is None or member.voice.channel.id != source_channel.id:
+            skipped += 1
+            continue
+        members.append(member)
+    return source_channel, members, skipped
+
+
+async def bring_members(
+    interaction: discord.Interaction,
+    clicker: discord.Member,
+    source_channel,
+    members: list,
+    skipped: int,
+    request_id: str,
+    command_name: str,
+):
+    guild = clicker.guild
+    destination = clicker.voice.channel
+    started_at = time.perf_counter()
+    summary = await move_members_concurrently(members, destination, f"طلب سحب جماعي بواسطة {clicker}")
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    record_timing("bring_bulk_ms", elapsed_ms)
+
+    for member in summary["moved"]:
+        record_audit(guild, command_name, clicker, member.id, request_id, f"-> {destination.name}")
+
+    moved_count = len(summary["moved"])
+    forbidden_count = len(summary["forbidden"])
+    failed_count = len(summary["failed"])
+    await send_interaction_embed(
+        interaction,
+        "bring_all_summary",
+        context=build_context(
+            guild=guild,
+            actor=clicker,
+            extra={
+                "request_id": request_id,
+                "requested_count": len(members) + skipped,
+                "moved_count": moved_count,
+                "forbidden_count": forbidden_count,
+                "failed_count": failed_count,
+                "skipped_count": skipped,
+                **_channel_context(source_channel, "voice"),
+                **_channel_context(destination, "destination"),
+            },
+        ),
+    )
+
+    moved_names = ", ".join(member.display_name for member in summary["moved"]) or "-"
+    failed_names = ", ".join(
+        [f"{member.display_name} (forbidden)" for member in summary["forbidden"]]
+        + [f"{member.display_name} ({error})" for member, error in summary["failed"]]
+    ) or "-"
+    level = "info" if forbidden_count == 0 and failed_count == 0 else "warning"
+    spawn_background(send_log(
+        guild,
+        level,
+        "تم السحب الجماعي",
+        (
+            f"{clicker.display_name} سحب {moved_count} من {len(members) + skipped} إلى {destination.name} (طلب {request_id}).\n"
+            f"تم النقل: {moved_names}\nفشل: {failed_names}\nتم التخطي: {skipped}"
+        ),
+        actor=clicker,
+        extra={
+            "request_id": request_id,
+            "command_name": command_name,
+            "error_text": _shorten_text(failed_names, 400) if level == "warning" else "غير معروف",
+            **_channel_context(source_channel, "voice"),
+            **_channel_context(destination, "destination"),
+        },
+        timings={"bulk_move_ms": round(elapsed_ms, 1), "members": len(members)},
+    ))
+
+
+async def _reject_same_channel_bring(interaction: discord.Interaction, clicker: discord.Member, source_channel, request_id: str) -> bool:
+    # Moving members into the channel they are already in is a no-op; answer before any API call.
+    if source_channel is None or clicker.voice.channel.id != source_channel.id:
+        return False
+    await send_interaction_embed(
+        interaction,
+        "bring_same_channel",
+        context=build_context(guild=clicker.guild, actor=clicker, extra={"request_id": request_id, **_channel_context(source_channel, "voice")}),
+    )
+    return True
+
+
+async def _resolve_bring_clicker(interaction: discord.Interaction, request_id: str, command_name: str):
+    guild = interaction.guild
+    if guild is None:
+        await send_interaction_embed(interaction, "button_server_only", context=build_context(extra={"request_id": request_id}))
+        return None
+
+    clicker = await resolve_interaction_member(interaction)
+    if clicker is None or not await member_can_use_bring_button(clicker):
+        await send_interaction_embed(interaction, "button_admin_only", context=build_context(guild=guild, actor=interaction.user, extra={"request_id": request_id}))
+        spawn_background(send_log(
+            guild,
+            "warning",
+            "محاولة سحب بدون صلاحية",
+            "تم استخدام السحب الجماعي من عضو لا يملك صلاحية السحب.",
+            actor=interaction.user,
+            extra={"request_id": request_id, "command_name": command_name},
+        ))
+        return None
+
+    if clicker.voice is None or clicker.voice.channel is None:
+        await send_interaction_embed(interaction, "button_join_voice_first", context=build_context(guild=guild, actor=clicker, extra={"request_id": request_id}))
+        return None
+
+    return clicker
+
+
+class BringSelectView(discord.ui.View):
+    def __init__(self, clicker_id: int, source_channel_id: int, request_id: str, members: list):
+        super().__init__(timeout=300)
+        self.clicker_id = clicker_id
+        self.source_channel_id = source_channel_id
+        self.request_id = request_id
+        options = [
+            discord.SelectOption(label=_shorten_text(member.display_name, 100), value=str(member.id))
+            for member in members[:BRING_SELECT_MAX_OPTIONS]
+        ]
+        member_select = discord.ui.Select(
+            placeholder="اختر الأعضاء المراد سحبهم",
+            min_values=1,
+            max_values=len(options),
+            options=options,
+            custom_id=f"bringselect:{request_id}",
+        )
+        member_select.callback = self.bring_selected
+        self.member_select = member_select
+        self.add_item(member_select)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return not await reject_if_shutting_down(interaction)
+
+    async def bring_selected(self, interaction: discord.Interaction):
+        # Acknowledge before any member lookup, file read or REST call; replies go through followup.
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if interaction.user.id != self.clicker_id:
+            await send_interaction_embed(interaction, "button_admin_only", context=build_context(guild=interaction.guild, actor=interaction.user, extra={"request_id": self.request_id}))
+            return
+
+        clicker = await _resolve_bring_clicker(interaction, self.request_id, "bringselect")
+        if clicker is None:
+            return
+
+        source_channel = clicker.guild.get_channel(self.source_channel_id)
+        if await _reject_same_channel_bring(interaction, clicker, source_channel, self.request_id):
+            return
+
+        member_ids = [int(value) for value in self.member_select.values]
+        source_channel, members, skipped = _members_in_monitored_channel(clicker.guild, self.source_channel_id, member_ids, exclude_id=clicker.id)
+        self.stop()
+        await bring_members(interaction, clicker, source_channel, members, skipped, self.request_id, "bringselect")
 
 
 async def send_join_notification(member: discord.Member, joined_channel: discord.VoiceChannel):
-    notify_channel_id = get_notify_channel_id()
+    notify_channel_id = await get_notify_channel_id()
     if not notify_channel_id:
         return
 
+    breaker = get_delivery_breaker(member.guild.id, "notify")
+    if not breaker.allow():
+        increment_stat("notify_delivery_skipped")
+        return
+
     notify_channel = member.guild.get_channel(notify_channel_id)
     if not isinstance(notify_channel, discord.TextChannel):
+        _record_delivery_failure(member.guild, "notify", breaker, f"invalid notify channel {notify_channel_id}")
         return
 
     request_id = uuid.uuid4().hex[:8]
@@ -768,7 +2455,7 @@ async def send_join_notification(member: discord.Member, joined_channel: discord
     )
 
     try:
-        await send_channel_embed(
+        message = await send_channel_embed(
             notify_channel,
             "join_notification",
             context=context,
@@ -776,13 +2463,18 @@ async def send_join_notification(member: discord.Member, joined_channel: discord
             content=member.mention,
             allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False),
         )
+        _record_delivery_success(member.guild, "notify", breaker)
+        record_audit(member.guild, "voice_join_notify", member, member.id, request_id, joined_channel.name)
+        guild_states.get(member.guild.id).track_notification(
+            message.id, member.id, joined_channel.id, request_id, time.time() + BRING_VIEW_TIMEOUT,
+        )
         await send_log(
             member.guild,
             "info",
             "تم إرسال تنبيه الانضمام",
-            f"تم إرسال تنبيه انضمام لـ {member.display_name} في {joined_channel.name} (طلب {request_id}).",
+            lambda: f"تم إرسال تنبيه انضمام لـ {member.display_name} في {joined_channel.name} (طلب {request_id}).",
             actor=member,
-            extra={
+            extra=lambda: {
                 "request_id": request_id,
                 "command_name": "voice_join_notify",
                 "user_mention": member.mention,
@@ -793,7 +2485,8 @@ async def send_join_notification(member: discord.Member, joined_channel: discord
             },
         )
     except Exception as error:
-        print("خطأ في إرسال تنبيه الانضمام:", error)
+        logger.error("خطأ في إرسال تنبيه الانضمام: %s", error)
+        _record_delivery_failure(member.guild, "notify", breaker, error)
         await send_log(
             member.guild,
             "error",
@@ -813,67 +2506,550 @@ async def send_join_notification(member: discord.Member, joined_channel: discord
         )
 
 
+def _command_tree_hash(guild: discord.abc.Snowflake = None) -> str:
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands(guild=guild)]
+    payload.sort(key=lambda item: (item.get("type", 1), item.get("name", "")))
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def sync_command_tree() -> tuple:
+    guild = None
+    scope = "global"
+    if DEV_GUILD_ID:
+        guild = discord.Object(id=int(DEV_GUILD_ID))
+        bot.tree.copy_global_to(guild=guild)
+        scope = f"guild:{guild.id}"
+
+    tree_hash = _command_tree_hash(guild)
+    sync_key = f"{bot.application_id}:{scope}"
+    stored_hashes = await read_json_async(COMMAND_SYNC_FILE, {})
+    if not isinstance(stored_hashes, dict):
+        stored_hashes = {}
+    if not FORCE_COMMAND_SYNC and stored_hashes.get(sync_key) == tree_hash:
+        return scope, None
+
+    synced = await bot.tree.sync(guild=guild)
+    async with get_file_update_lock(COMMAND_SYNC_FILE):
+        stored_hashes = await read_json_async(COMMAND_SYNC_FILE, {})
+        if not isinstance(stored_hashes, dict):
+            stored_hashes = {}
+        stored_hashes[sync_key] = tree_hash
+        write_json_deferred(COMMAND_SYNC_FILE, stored_hashes)
+    return scope, len(synced)
+
+
+async def fan_out(items, worker, limit: int) -> list:
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(item):
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
+async def _log_sync_failure(guild: discord.Guild, error: Exception):
+    await send_log(
+        guild,
+        "error",
+        "فشل مزامنة أوامر Slash",
+        str(error),
+        extra={
+            "command_name": "tree.sync",
+            "error_text": _shorten_text(error, 400),
+        },
+    )
+
+
+async def _configured_channel_ids() -> dict:
+    return {
+        "monitored_channel": await get_target_channel_id(),
+        "notify_channel": await get_notify_channel_id(),
+        "log_channel": await get_log_channel_id(),
+    }
+
+
+def _validate_guild_channels(guild: discord.Guild, channel_ids: dict) -> dict:
+    expected_types = {
+        "monitored_channel": (discord.VoiceChannel, discord.StageChannel),
+        "notify_channel": discord.TextChannel,
+        "log_channel": discord.TextChannel,
+    }
+    found = {}
+    for name, channel_id in channel_ids.items():
+        if not channel_id:
+            continue
+        channel = guild.get_channel(channel_id)
+        if channel is None:
+            continue
+        found[name] = "ok" if isinstance(channel, expected_types[name]) else "wrong_type"
+    return found
+
+
+async def _warm_voice_connect(guild: discord.Guild, target_id: int) -> bool:
+    channel = guild.get_channel(target_id)
+    if not isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+        return False
+    async with get_guild_voice_lock(guild.id):
+        await voice_manager.ensure_connected(guild, channel)
+    return True
+
+
+async def _startup_guild(guild: discord.Guild, channel_ids: dict, sync_error: Exception = None) -> dict:
+    result = {"channels": _validate_guild_channels(guild, channel_ids), "voice_warmed": False}
+    if sync_error is not None:
+        await _log_sync_failure(guild, sync_error)
+    restored_channel_id = restored_voice_channels.pop(guild.id, None)
+    if restored_channel_id is not None:
+        result["voice_warmed"] = await _warm_voice_connect(guild, restored_channel_id)
+    elif WARM_VOICE_CONNECT and result["channels"].get("monitored_channel") == "ok":
+        result["voice_warmed"] = await _warm_voice_connect(guild, channel_ids["monitored_channel"])
+    await send_log(
+        guild,
+        "info",
+        "تم تشغيل البوت",
+        f"تم تشغيل البوت بالحساب {bot.user}.",
+        extra={"state": "مشغل"},
+    )
+    return result
+
+
+async def run_startup(sync_error: Exception = None) -> dict:
+    started_at = time.perf_counter()
+    guilds = list(bot.guilds)
+    channel_ids = await _configured_channel_ids()
+    results = await fan_out(guilds, lambda guild: _startup_guild(guild, channel_ids, sync_error), STARTUP_CONCURRENCY)
+
+    channel_states = {name: "missing" if channel_id else "not_configured" for name, channel_id in channel_ids.items()}
+    failed_guilds = []
+    voice_warmed = 0
+    for guild, result in zip(guilds, results):
+        if isinstance(result, Exception):
+            failed_guilds.append(f"{guild.id}: {_shorten_text(result, 120)}")
+            continue
+        channel_states.update(result["channels"])
+        voice_warmed += int(result["voice_warmed"])
+
+    ready_ms = (time.perf_counter() - PROCESS_STARTED_AT) * 1000
+    record_timing("startup_fan_out_ms", (time.perf_counter() - started_at) * 1000)
+    record_timing("startup_ready_ms", ready_ms)
+    summary = {
+        "guilds": len(guilds),
+        "failed_guilds": failed_guilds,
+        "voice_warmed": voice_warmed,
+        "commands_synced": commands_synced,
+        "ready_ms": round(ready_ms, 1),
+        **channel_states,
+    }
+    logger.info("البوت جاهز: %s", json.dumps(summary, ensure_ascii=False))
+    return summary
+
+
+# Profiling
+def _profile_path(mode: str, extension: str) -> str:
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    return os.path.join(PROFILES_DIR, f"{mode}-{stamp}{extension}")
+
+
+def _summarize_cpu_profile(profiler: cProfile.Profile, path: str) -> str:
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler).stats
+    # Drop the loop's idle wait in the selector; it would top every capture.
+    busy = [item for item in stats.items() if not (item[0][0] == "~" and ("select." in item[0][2] or "_overlapped" in item[0][2]))]
+    top = sorted(busy, key=lambda item: item[1][2], reverse=True)[:PROFILE_TOP_ENTRIES]
+    lines = []
+    for (filename, line, function), (_, calls, own_time, cumulative_time, _) in top:
+        lines.append(
+            f"`{function}` {os.path.basename(filename)}:{line} | "
+            f"{own_time * 1000:.1f}ms own, {cumulative_time * 1000:.1f}ms cum, {calls} calls"
+        )
+    return "\n".join(lines)
+
+
+def _summarize_memory_profile(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, path: str) -> str:
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    after.dump(path)
+    lines = []
+    for stat in after.compare_to(before, "lineno")[:PROFILE_TOP_ENTRIES]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{os.path.basename(frame.filename)}:{frame.lineno} | "
+            f"{stat.size_diff / 1024:+.1f} KiB ({stat.size / 1024:.1f} KiB, {stat.count_diff:+d} blocks)"
+        )
+    return "\n".join(lines)
+
+
+async def capture_profile(mode: str, seconds: int) -> tuple:
+    if mode == "cpu":
+        path = _profile_path("cpu", ".prof")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        return path, await run_io(_summarize_cpu_profile, profiler, path)
+
+    path = _profile_path("memory", ".tracemalloc")
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return path, await run_io(_summarize_memory_profile, before, after, path)
+
+
+def _describe_handle(handle: asyncio.Handle) -> str:
+    owner = getattr(handle._callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        return f"task {owner.get_name()} ({owner.get_coro().__qualname__})"
+    return repr(handle._callback)
+
+
+def install_slow_callback_detector(threshold_ms: float):
+    # Wraps every loop callback (task steps included) by patching the private Handle._run,
+    # so it is opt-in: it costs two clock reads per callback and may break on a new CPython.
+    global original_handle_run
+    if original_handle_run is not None:
+        return
+    original_run = original_handle_run = asyncio.events.Handle._run
+    threshold = threshold_ms / 1000
+
+    def _run(handle):
+        started_at = time.perf_counter()
+        original_run(handle)
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= threshold:
+            increment_stat("slow_callbacks")
+            record_timing("slow_callback_ms", elapsed * 1000)
+            logger.warning("خطوة حجبت حلقة الأحداث لمدة %.0fms: %s", elapsed * 1000, _describe_handle(handle))
+
+    asyncio.events.Handle._run = _run
+
+
+def uninstall_slow_callback_detector():
+    global original_handle_run
+    if original_handle_run is not None:
+        asyncio.events.Handle._run = original_handle_run
+        original_handle_run = None
+
+
+async def sample_loop_lag():
+    # Sleep for a fixed interval; anything past the deadline is scheduling delay.
+    loop = asyncio.get_running_loop()
+    while True:
+        expected_at = loop.time() + LOOP_LAG_INTERVAL
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag_ms = max(loop.time() - expected_at, 0.0) * 1000
+        record_timing("loop_lag_ms", lag_ms)
+        set_gauge("loop_lag_ms", round(lag_ms, 1))
+
+
+loop_lag_task = None
+original_handle_run = None
+
+
+# Graceful shutdown
+def _time_left(deadline: float) -> float:
+    return max(deadline - time.monotonic(), 0.0)
+
+
+async def _drain_tasks(tasks: set, deadline: float) -> int:
+    # Draining can spawn more work (a handler logging its result), so repeat until quiet.
+    current = asyncio.current_task()
+    while True:
+        waiting = [task for task in tasks if task is not current and not task.done()]
+        if not waiting:
+            return 0
+        _, pending = await asyncio.wait(waiting, timeout=_time_left(deadline))
+        if pending:
+            for task in pending:
+                task.cancel()
+            return len(pending)
+
+
+async def _disconnect_voice_client(vc: discord.VoiceClient):
+    voice_manager.forget(vc.guild.id)
+    await vc.disconnect(force=True)
+
+
+async def shutdown(reason: str) -> dict:
+    global shutting_down
+    if shutting_down:
+        return {}
+    shutting_down = True
+    started_at = time.monotonic()
+    deadline = started_at + SHUTDOWN_TIMEOUT
+    logger.info("بدء إيقاف البوت (%s)، المهلة %.0f ثانية.", reason, SHUTDOWN_TIMEOUT)
+    for task in (embed_watcher_task, voice_watchdog_task, loop_lag_task):
+        if task is not None:
+            task.cancel()
+
+    # Handlers first: they queue logs, notifications and writes that are drained next.
+    dropped_handlers = await _drain_tasks(inflight_handlers, deadline)
+    dropped_tasks = await _drain_tasks(background_tasks, deadline)
+
+    try:
+        await asyncio.wait_for(flush_pending_writes(), max(_time_left(deadline), 1.0))
+        await asyncio.wait_for(audit_store.flush(), max(_time_left(deadline), 1.0))
+    except asyncio.TimeoutError:
+        pass
+
+    snapshot = build_state_snapshot()
+    try:
+        await run_io(_atomic_write_text, STATE_SNAPSHOT_FILE, json.dumps(snapshot, separators=(",", ":")))
+    except Exception as error:
+        logger.error("تعذر حفظ حالة البوت: %s", error)
+
+    voice_clients = [vc for vc in bot.voice_clients if isinstance(vc, discord.VoiceClient)]
+    voice_failed = 0
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(_disconnect_voice_client(vc) for vc in voice_clients), return_exceptions=True),
+            max(_time_left(deadline), 1.0),
+        )
+        voice_failed = sum(1 for result in results if isinstance(result, Exception))
+    except asyncio.TimeoutError:
+        voice_failed = len(voice_clients)
+
+    summary = {
+        "reason": reason,
+        "dropped_handlers": dropped_handlers,
+        "dropped_background_tasks": dropped_tasks,
+        "dropped_writes": sorted(pending_writes),
+        "snapshot_notifications": len(snapshot["notifications"]),
+        "snapshot_voice": len(snapshot["voice"]),
+        "voice_disconnected": len(voice_clients) - voice_failed,
+        "voice_failed": voice_failed,
+        "elapsed_ms": round((time.monotonic() - started_at) * 1000, 1),
+    }
+    logger.info("تم إيقاف البوت: %s", json.dumps(summary, ensure_ascii=False))
+
+    if journal_task is not None:
+        journal_task.cancel()
+    if event_journal.accepts(LOG_LEVEL_PRIORITIES["info"]):
+        event_journal.record(_journal_entry(
+            uuid.uuid4().hex[:10], "info", "إيقاف البوت", json.dumps(summary, ensure_ascii=False), None, None,
+            {"command_name": "shutdown"}, None,
+        ))
+    await event_journal.flush()
+    uninstall_slow_callback_detector()
+    if ingest_executor is not None:
+        ingest_executor.shutdown(wait=False, cancel_futures=True)
+    audit_store.executor.shutdown(wait=False)
+    await bot.close()
+    return summary
+
+
+# Warm restart snapshot
+def build_state_snapshot() -> dict:
+    now = time.time()
+    notifications = []
+    for state in guild_states.states.values():
+        for message_id, (member_id, source_channel_id, request_id, expires_at) in (state.notifications or {}).items():
+            if expires_at > now:
+                notifications.append([state.guild_id, message_id, member_id, source_channel_id, request_id, expires_at])
+    voice = {
+        str(vc.guild.id): vc.channel.id
+        for vc in bot.voice_clients
+        if isinstance(vc, discord.VoiceClient) and vc.channel is not None
+    }
+    return {
+        "saved_at": now,
+        "notifications": notifications,
+        "voice": voice,
+        "counters": dict(BOT_STATS["counters"]),
+    }
+
+
+def _take_state_snapshot() -> dict:
+    snapshot = _read_json(STATE_SNAPSHOT_FILE, {})
+    if os.path.exists(STATE_SNAPSHOT_FILE):
+        # One-shot: a crash after this restart must not replay an old snapshot.
+        os.remove(STATE_SNAPSHOT_FILE)
+    return snapshot if isinstance(snapshot, dict) else {}
+
+
+def restore_state_snapshot(snapshot: dict) -> dict:
+    now = time.time()
+    for name, value in snapshot.get("counters", {}).items():
+        if isinstance(value, int):
+            increment_stat(name, value)
+
+    loop = asyncio.get_running_loop()
+    views = 0
+    for guild_id, message_id, member_id, source_channel_id, request_id, expires_at in snapshot.get("notifications", []):
+        remaining = expires_at - now
+        if remaining <= 0:
+            continue
+        # Views re-attached by message ID must be persistent, so expiry is scheduled by hand.
+        view = BringMemberView(member_id, source_channel_id, request_id, timeout=None)
+        bot.add_view(view, message_id=message_id)
+        loop.call_later(remaining, view.stop)
+        guild_states.get(guild_id).track_notification(message_id, member_id, source_channel_id, request_id, expires_at)
+        views += 1
+
+    age = now - snapshot.get("saved_at", 0)
+    if age <= STATE_SNAPSHOT_MAX_AGE:
+        for guild_id, channel_id in snapshot.get("voice", {}).items():
+            restored_voice_channels[int(guild_id)] = channel_id
+    return {"views": views, "voice": len(restored_voice_channels), "age_s": round(age, 1)}
+
+
+def _request_shutdown(reason: str):
+    if not shutting_down:
+        spawn_background(shutdown(reason))
+
+
+async def setup_hook():
+    try:
+        snapshot = await run_io(_take_state_snapshot)
+        if snapshot:
+            logger.info("تمت استعادة حالة البوت: %s", json.dumps(restore_state_snapshot(snapshot), ensure_ascii=False))
+    except Exception as error:
+        logger.error("تعذر استعادة حالة البوت: %s", error)
+
+    loop = asyncio.get_running_loop()
+    set_gauge("event_loop", type(loop).__module__.split(".")[0])
+    if SLOW_CALLBACK_MS > 0:
+        if isinstance(loop, asyncio.BaseEventLoop):
+            install_slow_callback_detector(SLOW_CALLBACK_MS)
+        else:
+            logger.info("كاشف الخطوات البطيئة غير مدعوم مع %s، تم تعطيله.", type(loop).__name__)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, _request_shutdown, signal.Signals(signum).name)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops have no signal handlers; Ctrl+C falls back to discord.py's close.
+            pass
+
+
+bot.setup_hook = setup_hook
+
+
 # Events
 @bot.event
 async def on_ready():
-    EMBED_SETTINGS.clear()
-    EMBED_SETTINGS.update(_load_embed_settings())
+    refresh_bot_identity()
+    await reload_embed_settings()
     if bot.user:
-        print(f"تم تسجيل الدخول كـ {bot.user} ({bot.user.id})")
+        logger.info("تم تسجيل الدخول كـ %s (%s)", bot.user, bot.user.id)
     else:
-        print("تم تسجيل الدخول لكن لا يوجد مستخدم للبوت")
+        logger.warning("تم تسجيل الدخول لكن لا يوجد مستخدم للبوت")
 
+    global commands_synced, startup_started, embed_watcher_task, voice_watchdog_task, journal_task, loop_lag_task
+    sync_error = None
     try:
-        synced = await bot.tree.sync()
-        print(f"تمت مزامنة {len(synced)} أمر Slash.")
+        if not commands_synced:
+            scope, synced_count = await sync_command_tree()
+            commands_synced = True
+            if synced_count is None:
+                logger.info("أوامر Slash لم تتغير (%s)، تم تخطي المزامنة.", scope)
+            else:
+                logger.info("تمت مزامنة %s أمر Slash (%s).", synced_count, scope)
     except Exception as error:
-        print("فشلت مزامنة أوامر Slash:", error)
-        for guild in bot.guilds:
-            await send_log(
-                guild,
-                "error",
-                "فشل مزامنة أوامر Slash",
-                str(error),
-                extra={
-                    "command_name": "tree.sync",
-                    "error_text": _shorten_text(error, 400),
-                },
-            )
+        logger.error("فشلت مزامنة أوامر Slash: %s", error)
+        sync_error = error
+
+    if EMBED_WATCH_INTERVAL > 0 and embed_watcher_task is None:
+        embed_watcher_task = asyncio.create_task(watch_embed_settings())
+    if voice_watchdog_task is None:
+        voice_watchdog_task = asyncio.create_task(voice_manager.watch())
+    if JOURNAL_ENABLED and journal_task is None:
+        journal_task = asyncio.create_task(event_journal.run())
+    if LOOP_LAG_INTERVAL > 0 and loop_lag_task is None:
+        loop_lag_task = asyncio.create_task(sample_loop_lag())
+
+    if not startup_started:
+        startup_started = True
+        spawn_background(run_startup(sync_error))
+    elif sync_error is not None:
+        spawn_background(fan_out(bot.guilds, lambda guild: _log_sync_failure(guild, sync_error), STARTUP_CONCURRENCY))
 
-    for guild in bot.guilds:
-        await send_log(
-            guild,
-            "info",
-            "تم تشغيل البوت",
-            f"تم تشغيل البوت بالحساب {bot.user}.",
-            extra={"state": "مشغل"},
-        )
+
+@bot.event
+async def on_resumed():
+    refresh_bot_identity()
+
+
+@bot.event
+async def on_user_update(before: discord.User, after: discord.User):
+    if bot.user is not None and after.id == bot.user.id:
+        refresh_bot_identity()
+
+
+@bot.event
+async def on_guild_update(before: discord.Guild, after: discord.Guild):
+    state = guild_states.peek(after.id)
+    if state is not None:
+        state.identity = None
+
+
+def classify_voice_transition(before, after) -> str:
+    before_id = before.channel.id if before.channel else None
+    after_id = after.channel.id if after.channel else None
+    if before_id == after_id:
+        return "state_only"
+    if before_id is None:
+        return "join"
+    if after_id is None:
+        return "leave"
+    return "move"
 
 
 @bot.event
 async def on_voice_state_update(member: discord.Member, before, after):
+    # Mute, deafen, stream and video toggles arrive here too; only arrivals in a channel can need work.
+    transition = classify_voice_transition(before, after)
+    increment_stat(f"voice_events_{transition}")
+    if transition in ("state_only", "leave"):
+        return
     if member.bot:
         return
-    if not bot_enabled:
+    if not bot_enabled or shutting_down:
         return
 
-    target_id = get_target_channel_id()
+    task = asyncio.current_task()
+    inflight_handlers.add(task)
+    try:
+        await handle_voice_state_update(member, before, after)
+    finally:
+        inflight_handlers.discard(task)
+
+
+async def handle_voice_state_update(member: discord.Member, before, after):
+    target_id = await get_target_channel_id()
     if not target_id:
         return
 
     if after.channel and after.channel.id == target_id:
         if before.channel is None or before.channel.id != target_id:
             await send_join_notification(member, after.channel)
-            if not os.path.exists(WELCOME_AUDIO_PATH):
-                print(f"ملف الترحيب غير موجود: {WELCOME_AUDIO_PATH}")
+            clip_path = await get_welcome_clip_path(member.guild.id, after.channel.id)
+            try:
+                frames = await load_clip_frames(clip_path)
+            except Exception as error:
+                await _log_playback_error(member, after.channel, error)
+                return
+
+            if frames is None:
+                logger.error("ملف الترحيب غير موجود: %s", clip_path)
                 await send_log(
                     member.guild,
                     "error",
                     "ملف الترحيب غير موجود",
-                    f"تعذر العثور على ملف الترحيب: {WELCOME_AUDIO_PATH}",
+                    f"تعذر العثور على ملف الترحيب: {clip_path}",
                     actor=member,
                     extra={
-                        "audio_path": WELCOME_AUDIO_PATH,
+                        "audio_path": clip_path,
                         "command_name": "voice_join_playback",
                         **_channel_context(after.channel, "voice"),
                     },
@@ -882,26 +3058,24 @@ async def on_voice_state_update(member: discord.Member, before, after):
 
             async with get_guild_voice_lock(member.guild.id):
                 try:
-                    vc = member.guild.voice_client
-                    if not vc:
-                        vc = await after.channel.connect()
-                    elif vc.channel.id != target_id:
-                        await vc.move_to(after.channel)
+                    vc = await voice_manager.ensure_connected(member.guild, after.channel)
 
                     await asyncio.sleep(1)
 
                     if not vc.is_playing():
-                        source = discord.FFmpegPCMAudio(executable="ffmpeg", source=WELCOME_AUDIO_PATH)
+                        source = OpusFrameAudio(frames)
                         vc.play(source)
-                        print(f"تم تشغيل صوت الترحيب لـ {member}")
+                        voice_manager.touch(member.guild.id)
+                        logger.info("تم تشغيل صوت الترحيب لـ %s", member)
                         await send_log(
                             member.guild,
                             "info",
                             "تم تشغيل صوت الترحيب",
-                            f"تم تشغيل صوت الترحيب للعضو {member.display_name} في {after.channel.name}.",
+                            lambda: f"تم تشغيل صوت الترحيب للعضو {member.display_name} في {after.channel.name}.",
                             actor=member,
-                            extra={
+                            extra=lambda: {
                                 "command_name": "voice_join_playback",
+                                "audio_path": clip_path,
                                 "user_mention": member.mention,
                                 "user_display_name": member.display_name,
                                 "user_id": str(member.id),
@@ -909,22 +3083,26 @@ async def on_voice_state_update(member: discord.Member, before, after):
                             },
                         )
                 except Exception as error:
-                    print("خطأ صوتي:", error)
-                    await send_log(
-                        member.guild,
-                        "error",
-                        "فشل تشغيل صوت الترحيب",
-                        str(error),
-                        actor=member,
-                        extra={
-                            "command_name": "voice_join_playback",
-                            "error_text": _shorten_text(error, 400),
-                            "user_mention": member.mention,
-                            "user_display_name": member.display_name,
-                            "user_id": str(member.id),
-                            **_channel_context(after.channel, "voice"),
-                        },
-                    )
+                    await _log_playback_error(member, after.channel, error)
+
+
+async def _log_playback_error(member: discord.Member, channel, error: Exception):
+    logger.error("خطأ صوتي: %s", error)
+    await send_log(
+        member.guild,
+        "error",
+        "فشل تشغيل صوت الترحيب",
+        str(error),
+        actor=member,
+        extra={
+            "command_name": "voice_join_playback",
+            "error_text": _shorten_text(error, 400),
+            "user_mention": member.mention,
+            "user_display_name": member.display_name,
+            "user_id": str(member.id),
+            **_channel_context(channel, "voice"),
+        },
+    )
 
 
 # Slash commands (admin only)
@@ -933,6 +3111,7 @@ async def on_voice_state_update(member: discord.Member, before, after):
 @app_commands.checks.has_permissions(administrator=True)
 async def setchannel(interaction: discord.Interaction, channel: discord.VoiceChannel):
     set_target_channel_id(channel.id)
+    record_audit(interaction.guild, "setchannel", interaction.user, channel.id, details=channel.name)
     context = build_context(
         guild=interaction.guild,
         actor=interaction.user,
@@ -958,6 +3137,7 @@ async def setchannel(interaction: discord.Interaction, channel: discord.VoiceCha
 @app_commands.checks.has_permissions(administrator=True)
 async def setlogchannel(interaction: discord.Interaction, channel: discord.TextChannel):
     set_log_channel_id(channel.id)
+    record_audit(interaction.guild, "setlogchannel", interaction.user, channel.id, details=channel.name)
     context = build_context(
         guild=interaction.guild,
         actor=interaction.user,
@@ -983,6 +3163,7 @@ async def setlogchannel(interaction: discord.Interaction, channel: discord.TextC
 @app_commands.checks.has_permissions(administrator=True)
 async def setnotifychannel(interaction: discord.Interaction, channel: discord.TextChannel):
     set_notify_channel_id(channel.id)
+    record_audit(interaction.guild, "setnotifychannel", interaction.user, channel.id, details=channel.name)
     context = build_context(
         guild=interaction.guild,
         actor=interaction.user,
@@ -1017,8 +3198,9 @@ async def addbringrole(interaction: discord.Interaction, role: discord.Role):
         )
         return
 
-    was_added = add_allowed_bring_role(guild.id, role.id)
+    was_added = await add_allowed_bring_role(guild.id, role.id)
     if was_added:
+        record_audit(guild, "addbringrole", interaction.user, role.id, details=role.name)
         message = f"Added {role.mention} to the allowed roles for `{BRING_BUTTON_LABEL}`."
         log_event = "Bring role added"
         log_details = f"{interaction.user} added role {role.name} ({role.id}) to bring button access."
@@ -1063,8 +3245,9 @@ async def removebringrole(interaction: discord.Interaction, role: discord.Role):
         )
         return
 
-    was_removed = remove_allowed_bring_role(guild.id, role.id)
+    was_removed = await remove_allowed_bring_role(guild.id, role.id)
     if was_removed:
+        record_audit(guild, "removebringrole", interaction.user, role.id, details=role.name)
         message = f"Removed {role.mention} from `{BRING_BUTTON_LABEL}` access."
         log_event = "Bring role removed"
         log_details = f"{interaction.user} removed role {role.name} ({role.id}) from bring button access."
@@ -1108,7 +3291,7 @@ async def listbringroles(interaction: discord.Interaction):
         )
         return
 
-    role_ids = get_allowed_bring_role_ids(guild.id)
+    role_ids = await get_allowed_bring_role_ids(guild.id)
     valid_roles = []
     for role_id in role_ids:
         role = guild.get_role(role_id)
@@ -1116,7 +3299,7 @@ async def listbringroles(interaction: discord.Interaction):
             valid_roles.append(role)
 
     if [role.id for role in valid_roles] != role_ids:
-        set_allowed_bring_role_ids(guild.id, [role.id for role in valid_roles])
+        await set_allowed_bring_role_ids(guild.id, [role.id for role in valid_roles])
 
     if valid_roles:
         role_lines = "\n".join(f"- {role.mention}" for role in valid_roles)
@@ -1158,8 +3341,10 @@ async def clearbringroles(interaction: discord.Interaction):
         )
         return
 
-    had_roles = bool(get_allowed_bring_role_ids(guild.id))
-    set_allowed_bring_role_ids(guild.id, [])
+    had_roles = bool(await get_allowed_bring_role_ids(guild.id))
+    await set_allowed_bring_role_ids(guild.id, [])
+    if had_roles:
+        record_audit(guild, "clearbringroles", interaction.user)
 
     message = f"Cleared all extra roles for `{BRING_BUTTON_LABEL}`."
     if not had_roles:
@@ -1181,42 +3366,234 @@ async def clearbringroles(interaction: discord.Interaction):
     )
 
 
+@bot.tree.command(name="bringall", description="Bring every member in the monitored voice channel to your channel")
+async def bringall(interaction: discord.Interaction):
+    request_id = uuid.uuid4().hex[:8]
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    clicker = await _resolve_bring_clicker(interaction, request_id, "bringall")
+    if clicker is None:
+        return
+
+    source_channel, members, skipped = _members_in_monitored_channel(clicker.guild, await get_target_channel_id(), exclude_id=clicker.id)
+    if await _reject_same_channel_bring(interaction, clicker, source_channel, request_id):
+        return
+    if not members:
+        await send_interaction_embed(
+            interaction,
+            "bring_all_empty",
+            context=build_context(guild=clicker.guild, actor=clicker, extra={"request_id": request_id, **_channel_context(source_channel, "voice")}),
+        )
+        return
+
+    await bring_members(interaction, clicker, source_channel, members, skipped, request_id, "bringall")
+
+
+@bot.tree.command(name="bringselect", description="Pick members in the monitored voice channel to bring to your channel")
+async def bringselect(interaction: discord.Interaction):
+    request_id = uuid.uuid4().hex[:8]
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    clicker = await _resolve_bring_clicker(interaction, request_id, "bringselect")
+    if clicker is None:
+        return
+
+    source_channel, members, _ = _members_in_monitored_channel(clicker.guild, await get_target_channel_id(), exclude_id=clicker.id)
+    if await _reject_same_channel_bring(interaction, clicker, source_channel, request_id):
+        return
+    context = build_context(
+        guild=clicker.guild,
+        actor=clicker,
+        extra={
+            "request_id": request_id,
+            "member_count": len(members),
+            **_channel_context(source_channel, "voice"),
+            **_channel_context(clicker.voice.channel, "destination"),
+        },
+    )
+    if not members:
+        await send_interaction_embed(interaction, "bring_all_empty", context=context)
+        return
+
+    view = BringSelectView(clicker.id, source_channel.id, request_id, members)
+    await interaction.followup.send(embed=build_embed("bring_select_prompt", context), view=view, ephemeral=True)
+
+
+def _clip_length_note(clip_stats: dict) -> str:
+    kept = clip_stats["seconds"]
+    source = clip_stats.get("source_seconds")
+    if source is not None and source > MAX_CLIP_SECONDS:
+        return f"The upload is {source:.1f} s long; only the first {kept:.1f} s were kept (limit {MAX_CLIP_SECONDS} s)."
+    return f"Length: {kept:.1f} s."
+
+
+@bot.tree.command(name="setwelcomeclip", description="Upload a welcome clip for this server or one voice channel")
+@app_commands.describe(clip="Audio file to play on join", channel="Voice channel to use this clip for (default: whole server)")
+@app_commands.checks.has_permissions(administrator=True)
+async def setwelcomeclip(interaction: discord.Interaction, clip: discord.Attachment, channel: discord.VoiceChannel = None):
+    guild = interaction.guild
+    if guild is None:
+        await send_interaction_embed(
+            interaction,
+            "default",
+            context=build_context(actor=interaction.user, extra={"message": "This command can only be used in a server."}),
+            ephemeral=True,
+        )
+        return
+
+    extension = os.path.splitext(clip.filename)[1].lower()
+    if extension not in CLIP_EXTENSIONS or clip.size > MAX_CLIP_UPLOAD_BYTES:
+        message = (
+            f"Unsupported clip. Allowed types: {', '.join(CLIP_EXTENSIONS)}, "
+            f"maximum size: {MAX_CLIP_UPLOAD_BYTES // (1024 * 1024)} MB."
+        )
+        await send_interaction_embed(
+            interaction,
+            "default",
+            context=build_context(guild=guild, actor=interaction.user, extra={"message": message}),
+            ephemeral=True,
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    scope = str(channel.id) if channel else "default"
+    clip_path = os.path.join(CLIPS_DIR, str(guild.id), f"{scope}-{uuid.uuid4().hex[:8]}{extension}")
+    try:
+        await run_io(_atomic_write_bytes, clip_path, await clip.read())
+        clip_stats = await ingest_clip(clip_path)
+    except Exception as error:
+        await run_io(_remove_clip_file, clip_path)
+        await send_interaction_embed(
+            interaction,
+            "default",
+            context=build_context(guild=guild, actor=interaction.user, extra={"message": f"Could not decode the clip: `{_shorten_text(error, 300)}`"}),
+        )
+        return
+
+    previous_path = await set_welcome_clip(guild.id, scope, clip_path)
+    record_audit(guild, "setwelcomeclip", interaction.user, channel.id if channel else None, details=clip.filename)
+    if previous_path and previous_path != clip_path:
+        await run_io(_remove_clip_file, previous_path)
+
+    target_text = channel.mention if channel else "this server"
+    await send_interaction_embed(
+        interaction,
+        "default",
+        context=build_context(guild=guild, actor=interaction.user, extra={"message": f"Welcome clip for {target_text} set to `{clip.filename}`. {_clip_length_note(clip_stats)}"}),
+    )
+    await send_log(
+        guild,
+        "info",
+        "Welcome clip updated",
+        f"{interaction.user} set the welcome clip for {channel.name if channel else 'the server'} to {clip.filename}.",
+        actor=interaction.user,
+        extra={
+            "command_name": "setwelcomeclip",
+            "audio_path": clip_path,
+            **_channel_context(channel, "voice"),
+        },
+    )
+
+
+@bot.tree.command(name="clearwelcomeclip", description="Remove a custom welcome clip")
+@app_commands.describe(channel="Voice channel whose clip should be removed (default: server clip)")
+@app_commands.checks.has_permissions(administrator=True)
+async def clearwelcomeclip(interaction: discord.Interaction, channel: discord.VoiceChannel = None):
+    guild = interaction.guild
+    if guild is None:
+        await send_interaction_embed(
+            interaction,
+            "default",
+            context=build_context(actor=interaction.user, extra={"message": "This command can only be used in a server."}),
+            ephemeral=True,
+        )
+        return
+
+    previous_path = await set_welcome_clip(guild.id, str(channel.id) if channel else "default")
+    if previous_path:
+        await run_io(_remove_clip_file, previous_path)
+        record_audit(guild, "clearwelcomeclip", interaction.user, channel.id if channel else None)
+        message = f"Removed the custom welcome clip for {channel.mention if channel else 'this server'}."
+    else:
+        message = f"There was no custom welcome clip for {channel.mention if channel else 'this server'}."
+
+    await send_interaction_embed(
+        interaction,
+        "default",
+        context=build_context(guild=guild, actor=interaction.user, extra={"message": message}),
+        ephemeral=True,
+    )
+    await send_log(
+        guild,
+        "info",
+        "Welcome clip cleared",
+        f"{interaction.user} cleared the welcome clip for {channel.name if channel else 'the server'}.",
+        actor=interaction.user,
+        extra={
+            "command_name": "clearwelcomeclip",
+            **_channel_context(channel, "voice"),
+        },
+    )
+
+
 @bot.tree.command(name="reloadaudio", description="Check and reload the welcome audio file")
 @app_commands.checks.has_permissions(administrator=True)
 async def reloadaudio(interaction: discord.Interaction):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    audio_path = await get_welcome_clip_path(interaction.guild.id) if interaction.guild else WELCOME_AUDIO_PATH
     context = build_context(
         guild=interaction.guild,
         actor=interaction.user,
-        extra={"audio_path": WELCOME_AUDIO_PATH},
+        extra={"audio_path": audio_path},
     )
-    if os.path.exists(WELCOME_AUDIO_PATH):
-        await send_interaction_embed(interaction, "audio_validated", context=context, ephemeral=True)
+    if await run_io(_clip_file_state, audio_path) is None:
+        await send_interaction_embed(interaction, "audio_missing", context=context, ephemeral=True)
         if interaction.guild:
             await send_log(
                 interaction.guild,
-                "info",
-                "تم التحقق من ملف الصوت",
-                f"{context.get('actor_display_name', 'غير معروف')} تحقق من {WELCOME_AUDIO_PATH}.",
+                "error",
+                "ملف الصوت غير موجود",
+                f"{context.get('actor_display_name', 'غير معروف')} لم يجد الملف {audio_path}.",
                 actor=interaction.user,
                 extra={
                     "command_name": "reloadaudio",
-                    "audio_path": WELCOME_AUDIO_PATH,
+                    "audio_path": audio_path,
                 },
             )
-    else:
-        await send_interaction_embed(interaction, "audio_missing", context=context, ephemeral=True)
+        return
+
+    try:
+        clip_stats = await ingest_clip(audio_path)
+    except Exception as error:
+        context["error_text"] = _shorten_text(error, 400)
+        await send_interaction_embed(interaction, "audio_ingest_failed", context=context, ephemeral=True)
         if interaction.guild:
             await send_log(
                 interaction.guild,
                 "error",
-                "ملف الصوت غير موجود",
-                f"{context.get('actor_display_name', 'غير معروف')} لم يجد الملف {WELCOME_AUDIO_PATH}.",
+                "فشل معالجة ملف الصوت",
+                f"تعذر معالجة {audio_path}: {error}",
                 actor=interaction.user,
                 extra={
                     "command_name": "reloadaudio",
-                    "audio_path": WELCOME_AUDIO_PATH,
+                    "audio_path": audio_path,
+                    "error_text": _shorten_text(error, 400),
                 },
             )
+        return
+
+    context["clip_seconds"] = f"{clip_stats['seconds']:.1f}"
+    await send_interaction_embed(interaction, "audio_validated", context=context, ephemeral=True)
+    if interaction.guild:
+        await send_log(
+            interaction.guild,
+            "info",
+            "تم التحقق من ملف الصوت",
+            f"{context.get('actor_display_name', 'غير معروف')} أعاد معالجة {audio_path} ({clip_stats['frames']} إطار، {clip_stats['bytes']} بايت).",
+            actor=interaction.user,
+            extra={
+                "command_name": "reloadaudio",
+                "audio_path": audio_path,
+            },
+        )
 
 
 @bot.tree.command(name="togglebot", description="تفعيل أو تعطيل سلوك البوت التلقائي")
@@ -1225,6 +3602,7 @@ async def togglebot(interaction: discord.Interaction):
     global bot_enabled
     bot_enabled = not bot_enabled
     state = "مفعل" if bot_enabled else "معطل"
+    record_audit(interaction.guild, "togglebot", interaction.user, details=state)
     context = build_context(guild=interaction.guild, actor=interaction.user, extra={"state": state})
     if bot_enabled:
         await send_interaction_embed(interaction, "bot_enabled", context=context, ephemeral=True)
@@ -1257,7 +3635,7 @@ async def leave(interaction: discord.Interaction):
     if vc:
         channel_name = vc.channel.name if vc.channel else "غير معروف"
         voice_channel = vc.channel
-        await vc.disconnect()
+        await voice_manager.disconnect(guild)
         context["voice_channel_name"] = channel_name
         await send_interaction_embed(interaction, "leave_disconnected", context=context, ephemeral=True)
         await send_log(
@@ -1275,16 +3653,213 @@ async def leave(interaction: discord.Interaction):
         await send_interaction_embed(interaction, "leave_not_connected", context=context, ephemeral=True)
 
 
+@bot.tree.command(name="stats", description="Show runtime counters and timings")
+@app_commands.checks.has_permissions(administrator=True)
+async def stats(interaction: discord.Interaction):
+    voice_manager.publish_gauges()
+    set_gauge("cached_members", sum(len(guild.members) for guild in bot.guilds))
+    await send_interaction_embed(
+        interaction,
+        "default",
+        context=build_context(guild=interaction.guild, actor=interaction.user, extra={"message": _shorten_text(format_stats(), 4000)}),
+        ephemeral=True,
+    )
+
+
+@bot.tree.command(name="profile", description="التقاط تحليل أداء مؤقت للبوت (CPU أو الذاكرة)")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(mode="What to capture", seconds=f"Capture length in seconds (max {PROFILE_MAX_SECONDS})")
+@app_commands.choices(mode=[
+    app_commands.Choice(name="cpu (cProfile)", value="cpu"),
+    app_commands.Choice(name="memory (tracemalloc)", value="memory"),
+])
+async def profile(interaction: discord.Interaction, mode: app_commands.Choice[str], seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = 15):
+    global profile_running
+    context = build_context(guild=interaction.guild, actor=interaction.user, extra={"command_name": "profile", "profile_mode": mode.value, "profile_seconds": seconds})
+    if profile_running:
+        await send_interaction_embed(interaction, "profile_busy", context=context, ephemeral=True)
+        return
+
+    profile_running = True
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        path, summary = await capture_profile(mode.value, seconds)
+    except Exception as error:
+        context["error_text"] = _shorten_text(error, 400)
+        await send_interaction_embed(interaction, "generic_command_error", context=context, ephemeral=True)
+        return
+    finally:
+        profile_running = False
+
+    context["profile_path"] = path
+    context["profile_summary"] = summary or "-"
+    await send_interaction_embed(interaction, "profile_result", context=context, ephemeral=True)
+    if interaction.guild:
+        await send_log(
+            interaction.guild,
+            "info",
+            "تم التقاط تحليل أداء",
+            f"تحليل {mode.value} لمدة {seconds} ثانية محفوظ في {path}.",
+            actor=interaction.user,
+            extra={"command_name": "profile"},
+        )
+
+
+AUDIT_TARGET_FORMATS = {
+    "setchannel": "<#{}>", "setlogchannel": "<#{}>", "setnotifychannel": "<#{}>",
+    "setwelcomeclip": "<#{}>", "clearwelcomeclip": "<#{}>",
+    "addbringrole": "<@&{}>", "removebringrole": "<@&{}>",
+}
+
+
+def _format_audit_row(row) -> str:
+    ts, command, actor_id, target_id, request_id, details = row
+    line = f"<t:{int(ts)}:f> `{command}`"
+    if actor_id:
+        line += f" <@{actor_id}>"
+    if target_id and target_id != actor_id:
+        line += " → " + AUDIT_TARGET_FORMATS.get(command, "<@{}>").format(target_id)
+    if details:
+        line += f" {_shorten_text(details, 80)}"
+    if request_id:
+        line += f" `{request_id}`"
+    return line
+
+
+class AuditPageView(discord.ui.View):
+    def __init__(self, owner_id: int, guild_id: int, filters: dict, filters_text: str):
+        super().__init__(timeout=300)
+        self.owner_id = owner_id
+        self.guild_id = guild_id
+        self.filters = filters
+        self.filters_text = filters_text
+        self.page = 0
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return not await reject_if_shutting_down(interaction)
+
+    async def render(self, context: dict) -> discord.Embed:
+        # One extra row tells us whether a next page exists without a COUNT(*).
+        rows = await audit_store.query(self.guild_id, offset=self.page * AUDIT_PAGE_SIZE, limit=AUDIT_PAGE_SIZE + 1, **self.filters)
+        has_next = len(rows) > AUDIT_PAGE_SIZE
+        rows = rows[:AUDIT_PAGE_SIZE]
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = not has_next
+        context = {**context, "audit_filters": self.filters_text, "audit_page": self.page + 1}
+        if not rows:
+            return build_embed("audit_empty", context)
+        context["audit_lines"] = "\n".join(_format_audit_row(row) for row in rows)
+        return build_embed("audit_results", context)
+
+    async def _turn(self, interaction: discord.Interaction, step: int):
+        if interaction.user.id != self.owner_id:
+            await send_interaction_embed(interaction, "permission_denied", context=build_context(guild=interaction.guild, actor=interaction.user))
+            return
+        self.page = max(0, self.page + step)
+        embed = await self.render(build_context(guild=interaction.guild, actor=interaction.user))
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="السابق", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label="التالي", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
+
+
+@bot.tree.command(name="audit", description="عرض سجل التدقيق للسحب والإشعارات وتغييرات الإعدادات")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(
+    user="Only entries where this member is the actor or the target",
+    command="Only this action",
+    from_hours="Start of the time range, in hours ago (default: no start)",
+    to_hours="End of the time range, in hours ago (default: now)",
+)
+@app_commands.choices(command=[app_commands.Choice(name=name, value=name) for name in AUDIT_COMMANDS])
+async def audit(
+    interaction: discord.Interaction,
+    user: discord.Member = None,
+    command: app_commands.Choice[str] = None,
+    from_hours: app_commands.Range[int, 1, 24 * 365] = None,
+    to_hours: app_commands.Range[int, 0, 24 * 365] = None,
+):
+    guild = interaction.guild
+    if guild is None:
+        await send_interaction_embed(
+            interaction,
+            "default",
+            context=build_context(actor=interaction.user, extra={"message": "This command can only be used in a server."}),
+            ephemeral=True,
+        )
+        return
+
+    if from_hours is not None and to_hours is not None and to_hours >= from_hours:
+        await send_interaction_embed(
+            interaction,
+            "default",
+            context=build_context(guild=guild, actor=interaction.user, extra={"message": "`to_hours` must be smaller than `from_hours` (both count hours ago)."}),
+            ephemeral=True,
+        )
+        return
+
+    now = time.time()
+    filters = {
+        "user_id": user.id if user else None,
+        "command": command.value if command else None,
+        "since": now - from_hours * 3600 if from_hours is not None else None,
+        "until": now - to_hours * 3600 if to_hours else None,
+    }
+    if from_hours is not None and to_hours:
+        range_text = f"من {from_hours} إلى {to_hours} ساعة مضت"
+    elif from_hours is not None:
+        range_text = f"آخر {from_hours} ساعة"
+    elif to_hours:
+        range_text = f"حتى {to_hours} ساعة مضت"
+    else:
+        range_text = None
+    filters_text = " ".join(filter(None, [
+        user.mention if user else None,
+        f"`{command.value}`" if command else None,
+        range_text,
+    ])) or "الكل"
+    view = AuditPageView(interaction.user.id, guild.id, filters, filters_text)
+    context = build_context(guild=guild, actor=interaction.user, extra={"command_name": "audit"})
+    try:
+        embed = await view.render(context)
+    except Exception as error:
+        context["error_text"] = _shorten_text(error, 400)
+        await send_interaction_embed(interaction, "generic_command_error", context=context, ephemeral=True)
+        return
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True, allowed_mentions=discord.AllowedMentions.none())
+
+
 @bot.tree.command(name="reloadembeds", description="إعادة تحميل إعدادات الـ Embed من ملف JSON")
 @app_commands.checks.has_permissions(administrator=True)
 async def reloadembeds(interaction: discord.Interaction):
-    EMBED_SETTINGS.clear()
-    EMBED_SETTINGS.update(_load_embed_settings())
+    error_text = await reload_embed_settings()
     context = build_context(
         guild=interaction.guild,
         actor=interaction.user,
-        extra={"settings_file": EMBED_SETTINGS_FILE},
+        extra={"settings_file": EMBED_SETTINGS_FILE, "error_text": error_text or "غير معروف"},
     )
+    if error_text:
+        await send_interaction_embed(interaction, "reload_embeds_failed", context=context, ephemeral=True)
+        if interaction.guild:
+            await send_log(
+                interaction.guild,
+                "error",
+                "فشل إعادة تحميل إعدادات الـ Embed",
+                f"{context.get('actor_display_name', 'غير معروف')} حاول إعادة تحميل {EMBED_SETTINGS_FILE} لكن الملف غير صالح، تم الإبقاء على آخر إعدادات صالحة.",
+                actor=interaction.user,
+                extra={
+                    "command_name": "reloadembeds",
+                    "settings_file": EMBED_SETTINGS_FILE,
+                    "error_text": _shorten_text(error_text, 400),
+                },
+            )
+        return
+
     await send_interaction_embed(interaction, "reload_embeds_success", context=context, ephemeral=True)
     if interaction.guild:
         await send_log(
@@ -1300,6 +3875,13 @@ async def reloadembeds(interaction: discord.Interaction):
         )
 
 
+async def tree_interaction_check(interaction: discord.Interaction) -> bool:
+    return not await reject_if_shutting_down(interaction)
+
+
+bot.tree.interaction_check = tree_interaction_check
+
+
 # App command error handler
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -1349,10 +3931,34 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
         )
 
 
+def get_loop_runner():
+    if not USE_UVLOOP:
+        return asyncio.run
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("USE_UVLOOP مفعل لكن uvloop غير مثبت، سيتم استخدام حلقة asyncio الافتراضية.")
+        return asyncio.run
+    return uvloop.run
+
+
+async def run_bot():
+    bot.http.connector = create_rest_connector()
+    async with bot:
+        await bot.start(TOKEN)
+
+
 if __name__ == "__main__":
-    EMBED_SETTINGS = _load_embed_settings()
-    if not TOKEN:
-        print("المتغير DISCORD_TOKEN غير موجود في ملف .env")
-    else:
-        bot.run(TOKEN)
+    setup_logging()
+    embed_snapshot = _load_embed_settings()
+    apply_log_threshold()
+    try:
+        if not TOKEN:
+            logger.critical("المتغير DISCORD_TOKEN غير موجود في ملف .env")
+        else:
+            get_loop_runner()(run_bot())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_listener.stop()
 
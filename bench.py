@@ -0,0 +1,224 @@
+"""Local benchmarks for join-voice-bot internals.
+
+Run `python bench.py <name>`; each benchmark prints its numbers and exits with
+status 1 when a budget is exceeded. No Discord connection is made.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import discord
+
+import app
+
+MONITORED_CHANNEL_ID = 10
+LOG_CHANNEL_ID = 20
+
+
+def bench_state(args) -> bool:
+    async def populate(registry, count):
+        for guild_id in range(1, count + 1):
+            state = registry.get(guild_id)
+            state.voice_lock = asyncio.Lock()
+            state.log_breaker = app.CircuitBreaker()
+
+    registry = app.GuildStateRegistry(max_guilds=args.guilds, idle_seconds=3600)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started_at = time.perf_counter()
+    asyncio.run(populate(registry, args.guilds))
+    elapsed = time.perf_counter() - started_at
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    per_guild = total / args.guilds
+    print(f"guild states: {len(registry)} in {elapsed * 1000:.1f}ms")
+    print(f"memory: {total / 1024:.1f} KiB total, {per_guild:.0f} bytes per guild (budget {args.budget_bytes})")
+
+    bounded = app.GuildStateRegistry(max_guilds=args.guilds // 10 or 1, idle_seconds=3600)
+    for guild_id in range(1, args.guilds + 1):
+        bounded.get(guild_id)
+    print(f"bounded registry: {len(bounded)} kept, {bounded.evictions} evicted (max {bounded.max_guilds})")
+
+    ok = per_guild <= args.budget_bytes and len(bounded) <= bounded.max_guilds
+    if not ok:
+        print("FAIL: guild state memory budget exceeded")
+    return ok
+
+
+class _Channel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+
+
+class _TextChannel(discord.TextChannel):
+    # Accepts sends without a network round-trip.
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.name = "bench-log"
+
+    async def send(self, **kwargs):
+        return None
+
+
+class _Guild:
+    def __init__(self, log_channel):
+        self.id = 1
+        self.name = "bench"
+        self.voice_client = None
+        self._log_channel = log_channel
+
+    def get_channel(self, channel_id):
+        return self._log_channel if channel_id == LOG_CHANNEL_ID else None
+
+
+class _VoiceState:
+    def __init__(self, channel_id):
+        self.channel = _Channel(channel_id) if channel_id else None
+
+
+class _Member:
+    bot = False
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.id = 1000
+        self.name = self.display_name = "bench-user"
+        self.mention = "<@1000>"
+
+
+async def _loop_workload(events: int, logs: int) -> dict:
+    app.guild_states = app.GuildStateRegistry(app.GUILD_STATE_MAX, app.GUILD_STATE_IDLE_SECONDS)
+    guild = _Guild(_TextChannel(LOG_CHANNEL_ID))
+    member = _Member(guild)
+    # Moves between two unmonitored channels: the handler runs but ends before any Discord call.
+    before, after = _VoiceState(30), _VoiceState(31)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(app.on_voice_state_update(member, before, after) for _ in range(events)))
+    voice_elapsed = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(
+        app.send_log(guild, "info", "bench", "log pipeline benchmark", actor=member, extra={"command_name": "bench"})
+        for _ in range(logs)
+    ))
+    log_elapsed = time.perf_counter() - started_at
+    return {"voice_events_per_s": events / voice_elapsed, "logs_per_s": logs / log_elapsed}
+
+
+def _embed_total(embed: discord.Embed) -> int:
+    parts = [embed.title or "", embed.description or "", embed.author.name or "", embed.footer.text or ""]
+    parts += [text for field in embed.fields for text in (field.name, field.value)]
+    return sum(len(part) for part in parts)
+
+
+def bench_embeds(args) -> bool:
+    app.embed_snapshot = app._load_embed_settings()
+    ok = True
+
+    # A long detail that fits Discord's limits must come through untouched.
+    details = "x" * args.details
+    before = app.BOT_STATS["counters"].get("embed_truncations", 0)
+    embed = app.build_embed("log_info", app.build_context(extra={"event": "bench", "details": details}))
+    value = next(field.value for field in embed.fields if field.value.startswith("x"))
+    truncated = app.BOT_STATS["counters"].get("embed_truncations", 0) - before
+    print(f"log_info: {args.details}-char details -> {len(value)} chars, total {_embed_total(embed)}, truncations {truncated}")
+    if value != details or truncated:
+        print("FAIL: details were shortened although the embed fits")
+        ok = False
+
+    # Every placeholder oversized: each part stays in its own limit and the total within 6000.
+    huge = "y" * 10000
+    context = app.build_context(extra={key: huge for key in ("event", "details", "actor_mention", "command_name", "request_id", "guild_name")})
+    for embed_key in ("log_info", "log_error", "log_warning"):
+        embed = app.build_embed(embed_key, context)
+        total = _embed_total(embed)
+        print(f"{embed_key}: worst case total {total}, {len(embed.fields)} fields")
+        over_part = len(embed.title) > 256 or len(embed.description or "") > 4096 or any(len(field.value) > 1024 for field in embed.fields)
+        if total > app.EMBED_MAX_TOTAL or over_part:
+            print(f"FAIL: {embed_key} exceeds Discord's embed limits")
+            ok = False
+    return ok
+
+
+def _loop_runners() -> dict:
+    runners = {"asyncio": asyncio.run}
+    try:
+        import uvloop
+    except ImportError:
+        print("uvloop is not installed; only the default loop is measured")
+    else:
+        runners["uvloop"] = uvloop.run
+    return runners
+
+
+def bench_loop(args) -> bool:
+    app.embed_snapshot = app._load_embed_settings()
+    app.apply_log_threshold()
+    # The console handler binds sys.stdout when created; point it at devnull for the run.
+    devnull = open(os.devnull, "w")
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        app.setup_logging()
+    finally:
+        sys.stdout = stdout
+
+    workdir = tempfile.mkdtemp(prefix="jvb-bench-")
+    os.chdir(workdir)
+    with open(app.TARGET_CHANNEL_FILE, "w", encoding="utf-8") as file:
+        file.write(str(MONITORED_CHANNEL_ID))
+    with open(app.LOG_CHANNEL_FILE, "w", encoding="utf-8") as file:
+        file.write(str(LOG_CHANNEL_ID))
+
+    results = {}
+    try:
+        for name, runner in _loop_runners().items():
+            results[name] = [runner(_loop_workload(args.events, args.logs)) for _ in range(args.rounds)]
+    finally:
+        app.log_listener.stop()
+        devnull.close()
+
+    print(f"{args.events} voice events and {args.logs} logs per round, best of {args.rounds}")
+    for name, rounds in results.items():
+        voice = max(result["voice_events_per_s"] for result in rounds)
+        logs = max(result["logs_per_s"] for result in rounds)
+        print(f"{name:>8}: {voice:10.0f} voice events/s {logs:10.0f} logs/s")
+    return True
+
+
+BENCHMARKS = {
+    "state": bench_state,
+    "loop": bench_loop,
+    "embeds": bench_embeds,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="name", required=True)
+
+    state = subparsers.add_parser("state", help="per-guild runtime state size and eviction")
+    state.add_argument("--guilds", type=int, default=10000)
+    state.add_argument("--budget-bytes", type=int, default=1024, help="max bytes per guild state")
+
+    loop = subparsers.add_parser("loop", help="default asyncio loop vs uvloop on the voice and log paths")
+    loop.add_argument("--events", type=int, default=5000)
+    loop.add_argument("--logs", type=int, default=5000)
+    loop.add_argument("--rounds", type=int, default=3)
+
+    embeds = subparsers.add_parser("embeds", help="embed limit handling: no needless truncation, worst case within 6000")
+    embeds.add_argument("--details", type=int, default=1000, help="length of the {details} placeholder")
+
+    args = parser.parse_args()
+    return 0 if BENCHMARKS[args.name](args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
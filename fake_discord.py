@@ -0,0 +1,418 @@
+"""Local stand-in for the Discord REST API and gateway.
+
+Serves one fake guild with enough of the REST API (messages, member moves,
+interaction callbacks, followups, command sync) and gateway dispatch
+(READY, GUILD_CREATE, VOICE_STATE_UPDATE, INTERACTION_CREATE) to run the real
+bot offline. Latency, 429s and 5xx responses can be injected on REST calls.
+Voice connections are not emulated.
+
+    python fake_discord.py --latency-ms 80 --rate-429 0.05 --rate-5xx 0.02
+
+Point the bot at it (the printed channel IDs go in target_channel.txt and
+notify_channel.txt):
+
+    DISCORD_TOKEN=fake DISCORD_API_BASE=http://127.0.0.1:8800/api/v10 \\
+    DISCORD_GATEWAY_URL=ws://127.0.0.1:8800/gateway python app.py
+
+Control endpoints (JSON bodies):
+    POST /_control/faults  {"latency_ms", "jitter_ms", "rate_429", "rate_5xx", "retry_after"}
+    POST /_control/join    {"user_id", "channel_id"}   user joins a voice channel
+    POST /_control/leave   {"user_id"}
+    POST /_control/click   {"user_id", "message_id"}   click the first button of a message
+    GET  /_control/stats
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import zlib
+from collections import Counter
+
+from aiohttp import web
+
+DISCORD_EPOCH_MS = 1420070400000
+GUILD_ID = 900000000000000001
+BOT_ID = 900000000000000002
+ADMIN_ROLE_ID = 900000000000000003
+MONITORED_CHANNEL_ID = 900000000000000010
+LOUNGE_CHANNEL_ID = 900000000000000011
+NOTIFY_CHANNEL_ID = 900000000000000020
+LOG_CHANNEL_ID = 900000000000000021
+USER_ID_BASE = 900000000000001000
+EVERYONE_PERMISSIONS = (1 << 10) | (1 << 11) | (1 << 20) | (1 << 21)  # view, send, connect, speak
+ADMIN_PERMISSIONS = 1 << 3
+RETRYABLE_5XX = (500, 502, 504)
+
+_sequence = itertools.count()
+
+
+def json_response(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly application/json.
+    return web.Response(
+        body=json.dumps(data).encode("utf-8"), status=status,
+        headers={**(headers or {}), "Content-Type": "application/json"},
+    )
+
+
+def snowflake() -> int:
+    return ((int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22) | (next(_sequence) & 0x3FFFFF)
+
+
+def iso_now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+
+
+class GatewaySession:
+    __slots__ = ("ws", "compressor", "sequence")
+
+    def __init__(self, ws: web.WebSocketResponse, compress: bool):
+        self.ws = ws
+        self.compressor = zlib.compressobj() if compress else None
+        self.sequence = 0
+
+    async def send(self, payload: dict):
+        text = json.dumps(payload)
+        if self.compressor is None:
+            await self.ws.send_str(text)
+            return
+        data = self.compressor.compress(text.encode("utf-8")) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        await self.ws.send_bytes(data)
+
+    async def dispatch(self, event: str, data: dict):
+        self.sequence += 1
+        await self.send({"op": 0, "t": event, "s": self.sequence, "d": data})
+
+
+class FakeDiscord:
+    def __init__(self, args):
+        self.faults = {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "rate_429": args.rate_429,
+            "rate_5xx": args.rate_5xx,
+            "retry_after": args.retry_after,
+        }
+        self.admins = set(args.admins)
+        self.gateway_url = f"ws://{args.host}:{args.port}/gateway"
+        self.sessions = set()
+        self.users = {BOT_ID: {"id": str(BOT_ID), "username": "join-voice-bot", "discriminator": "0", "global_name": None, "avatar": None, "bot": True}}
+        self.voice_states = {}
+        self.messages = {}
+        self.commands = {}
+        self.stats = Counter()
+        self.random = random.Random(args.seed)
+
+    # Payloads
+    def user(self, user_id: int) -> dict:
+        user = self.users.get(user_id)
+        if user is None:
+            user = {"id": str(user_id), "username": f"user{user_id - USER_ID_BASE}", "discriminator": "0", "global_name": None, "avatar": None, "bot": False}
+            self.users[user_id] = user
+        return user
+
+    def member(self, user_id: int) -> dict:
+        roles = [str(ADMIN_ROLE_ID)] if user_id == BOT_ID or user_id in self.admins else []
+        return {
+            "user": self.user(user_id), "roles": roles, "joined_at": iso_now(), "nick": None, "avatar": None,
+            "deaf": False, "mute": False, "flags": 0, "pending": False, "premium_since": None,
+        }
+
+    def voice_state(self, user_id: int) -> dict:
+        channel_id = self.voice_states.get(user_id)
+        return {
+            "guild_id": str(GUILD_ID), "channel_id": str(channel_id) if channel_id else None,
+            "user_id": str(user_id), "member": self.member(user_id), "session_id": f"fake-{user_id}",
+            "deaf": False, "mute": False, "self_deaf": False, "self_mute": False, "self_video": False,
+            "suppress": False, "request_to_speak_timestamp": None,
+        }
+
+    def channel(self, channel_id: int, name: str, channel_type: int, position: int) -> dict:
+        channel = {
+            "id": str(channel_id), "type": channel_type, "name": name, "position": position,
+            "guild_id": str(GUILD_ID), "permission_overwrites": [], "parent_id": None, "nsfw": False,
+        }
+        if channel_type == 2:
+            channel.update({"bitrate": 64000, "user_limit": 0, "rtc_region": None})
+        return channel
+
+    def guild(self) -> dict:
+        role = {"color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0, "icon": None, "unicode_emoji": None}
+        in_voice = [BOT_ID, *self.voice_states]
+        return {
+            "id": str(GUILD_ID), "name": "Fake Guild", "icon": None, "owner_id": str(BOT_ID), "unavailable": False,
+            "roles": [
+                {**role, "id": str(GUILD_ID), "name": "@everyone", "position": 0, "permissions": str(EVERYONE_PERMISSIONS)},
+                {**role, "id": str(ADMIN_ROLE_ID), "name": "Admin", "position": 1, "permissions": str(ADMIN_PERMISSIONS)},
+            ],
+            "channels": [
+                self.channel(MONITORED_CHANNEL_ID, "monitored", 2, 0),
+                self.channel(LOUNGE_CHANNEL_ID, "lounge", 2, 1),
+                self.channel(NOTIFY_CHANNEL_ID, "join-notify", 0, 2),
+                self.channel(LOG_CHANNEL_ID, "bot-log", 0, 3),
+            ],
+            "members": [self.member(user_id) for user_id in in_voice],
+            "voice_states": [self.voice_state(user_id) for user_id in self.voice_states],
+            "member_count": len(in_voice), "large": False, "joined_at": iso_now(),
+            "emojis": [], "stickers": [], "features": [], "threads": [], "presences": [],
+            "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+            "premium_tier": 0, "verification_level": 0, "explicit_content_filter": 0, "mfa_level": 0,
+            "nsfw_level": 0, "default_message_notifications": 0, "system_channel_flags": 0,
+            "preferred_locale": "en-US",
+        }
+
+    def message(self, channel_id: int, body: dict, author_id: int = BOT_ID) -> dict:
+        message = {
+            "id": str(snowflake()), "channel_id": str(channel_id), "guild_id": str(GUILD_ID),
+            "author": self.user(author_id), "content": body.get("content") or "", "embeds": body.get("embeds") or [],
+            "components": body.get("components") or [], "attachments": [], "mentions": [], "mention_roles": [],
+            "mention_everyone": False, "pinned": False, "tts": False, "type": 0, "flags": body.get("flags") or 0,
+            "timestamp": iso_now(), "edited_timestamp": None,
+        }
+        self.messages[int(message["id"])] = message
+        return message
+
+    async def broadcast(self, event: str, data: dict):
+        for session in list(self.sessions):
+            try:
+                await session.dispatch(event, data)
+            except ConnectionError:
+                self.sessions.discard(session)
+
+    # Fault injection
+    @web.middleware
+    async def faults_middleware(self, request: web.Request, handler):
+        if not request.path.startswith("/api/"):
+            return await handler(request)
+        resource = request.match_info.route.resource
+        self.stats[f"{request.method} {resource.canonical if resource is not None else request.path}"] += 1
+        delay = self.faults["latency_ms"] + self.random.uniform(0, self.faults["jitter_ms"])
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = self.random.random()
+        if roll < self.faults["rate_429"]:
+            self.stats["injected_429"] += 1
+            retry_after = self.faults["retry_after"]
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                status=429,
+                headers={
+                    "Via": "1.1 fake-discord", "Retry-After": str(retry_after), "X-RateLimit-Limit": "5",
+                    "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": str(retry_after),
+                    "X-RateLimit-Bucket": "fake", "X-RateLimit-Scope": "user",
+                },
+            )
+        if roll < self.faults["rate_429"] + self.faults["rate_5xx"]:
+            self.stats["injected_5xx"] += 1
+            return json_response({"message": "Internal Server Error", "code": 0}, status=self.random.choice(RETRYABLE_5XX))
+        return await handler(request)
+
+    # REST
+    async def get_user(self, request):
+        return json_response(self.users[BOT_ID])
+
+    async def get_application(self, request):
+        return json_response({
+            "id": str(BOT_ID), "name": "join-voice-bot", "icon": None, "description": "", "summary": "",
+            "bot_public": True, "bot_require_code_grant": False, "owner": self.users[BOT_ID], "team": None,
+            "verify_key": "0" * 64, "flags": 0,
+        })
+
+    async def get_gateway(self, request):
+        return json_response({
+            "url": self.gateway_url, "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def get_commands(self, request):
+        return json_response(self.commands.get(request.match_info.get("guild_id"), []))
+
+    async def put_commands(self, request):
+        commands = []
+        for command in await request.json():
+            commands.append({**command, "id": str(snowflake()), "application_id": str(BOT_ID), "version": str(snowflake())})
+        self.commands[request.match_info.get("guild_id")] = commands
+        return json_response(commands)
+
+    async def create_message(self, request):
+        return json_response(self.message(int(request.match_info["channel_id"]), await request.json()))
+
+    async def edit_message(self, request):
+        message = self.messages.get(int(request.match_info["message_id"]))
+        if message is None:
+            return json_response({"message": "Unknown Message", "code": 10008}, status=404)
+        message.update({key: value for key, value in (await request.json()).items() if key in ("content", "embeds", "components")})
+        message["edited_timestamp"] = iso_now()
+        return json_response(message)
+
+    async def get_member(self, request):
+        user_id = int(request.match_info["user_id"])
+        if user_id not in self.users:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        return json_response(self.member(user_id))
+
+    async def edit_member(self, request):
+        user_id = int(request.match_info["user_id"])
+        body = await request.json()
+        if "channel_id" in body:
+            await self.move(user_id, int(body["channel_id"]) if body["channel_id"] else None)
+        return json_response(self.member(user_id))
+
+    async def interaction_callback(self, request):
+        body = await request.json()
+        callback_type = body.get("type")
+        interaction = {
+            "id": request.match_info["interaction_id"], "type": 3,
+            "response_message_loading": callback_type == 5,
+            "response_message_ephemeral": bool((body.get("data") or {}).get("flags", 0) & 64),
+        }
+        resource = {"type": callback_type}
+        if callback_type == 4:
+            message = self.message(0, body.get("data") or {})
+            interaction["response_message_id"] = message["id"]
+            resource["message"] = message
+        return json_response({"interaction": interaction, "resource": resource})
+
+    async def followup(self, request):
+        return json_response(self.message(0, await request.json()))
+
+    async def edit_original(self, request):
+        return json_response(self.message(0, await request.json()))
+
+    # Gateway
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = GatewaySession(ws, request.query.get("compress") == "zlib-stream")
+        await session.send({"op": 10, "d": {"heartbeat_interval": 41250}})
+        try:
+            async for message in ws:
+                if message.type != web.WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                op = payload.get("op")
+                if op == 1:
+                    await session.send({"op": 11})
+                elif op == 2:
+                    await session.dispatch("READY", {
+                        "v": 10, "user": self.users[BOT_ID], "guilds": [{"id": str(GUILD_ID), "unavailable": True}],
+                        "session_id": "fake-session", "resume_gateway_url": self.gateway_url,
+                        "application": {"id": str(BOT_ID), "flags": 0},
+                    })
+                    await session.dispatch("GUILD_CREATE", self.guild())
+                    self.sessions.add(session)
+                elif op == 6:
+                    await session.dispatch("RESUMED", {})
+                    self.sessions.add(session)
+                elif op == 8:
+                    guild = self.guild()
+                    await session.dispatch("GUILD_MEMBERS_CHUNK", {
+                        "guild_id": str(GUILD_ID), "members": guild["members"], "chunk_index": 0,
+                        "chunk_count": 1, "nonce": payload["d"].get("nonce"),
+                    })
+                self.stats[f"gateway op {op}"] += 1
+        finally:
+            self.sessions.discard(session)
+        return ws
+
+    # Control
+    async def move(self, user_id: int, channel_id):
+        if channel_id is None:
+            self.voice_states.pop(user_id, None)
+        else:
+            self.voice_states[user_id] = channel_id
+        await self.broadcast("VOICE_STATE_UPDATE", self.voice_state(user_id))
+
+    async def control_faults(self, request):
+        for key, value in (await request.json()).items():
+            if key in self.faults:
+                self.faults[key] = float(value)
+        return json_response(self.faults)
+
+    async def control_join(self, request):
+        body = await request.json()
+        user_id = int(body.get("user_id", USER_ID_BASE + 1))
+        await self.move(user_id, int(body.get("channel_id", MONITORED_CHANNEL_ID)))
+        return json_response(self.voice_state(user_id))
+
+    async def control_leave(self, request):
+        body = await request.json()
+        user_id = int(body.get("user_id", USER_ID_BASE + 1))
+        await self.move(user_id, None)
+        return json_response(self.voice_state(user_id))
+
+    async def control_click(self, request):
+        body = await request.json()
+        user_id = int(body.get("user_id", USER_ID_BASE))
+        message = self.messages.get(int(body["message_id"])) if "message_id" in body else next(
+            (message for message in reversed(list(self.messages.values())) if message["components"]), None,
+        )
+        if message is None or not message["components"]:
+            return json_response({"error": "no message with components"}, status=404)
+        custom_id = message["components"][0]["components"][0]["custom_id"]
+        interaction_id = snowflake()
+        permissions = ADMIN_PERMISSIONS if user_id in self.admins else EVERYONE_PERMISSIONS
+        await self.broadcast("INTERACTION_CREATE", {
+            "id": str(interaction_id), "application_id": str(BOT_ID), "type": 3, "version": 1,
+            "token": f"fake-token-{interaction_id}", "guild_id": str(GUILD_ID), "channel_id": message["channel_id"],
+            "data": {"custom_id": custom_id, "component_type": 2},
+            "member": {**self.member(user_id), "permissions": str(permissions)},
+            "message": message, "locale": "en-US", "guild_locale": "en-US",
+            "app_permissions": str(ADMIN_PERMISSIONS), "entitlements": [], "attachment_size_limit": 8 * 1024 * 1024,
+            "authorizing_integration_owners": {"0": str(GUILD_ID)}, "context": 0,
+        })
+        return json_response({"interaction_id": str(interaction_id), "custom_id": custom_id})
+
+    async def control_stats(self, request):
+        return json_response({"faults": self.faults, "sessions": len(self.sessions), "counts": dict(self.stats)})
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults_middleware])
+        api = "/api/v{version}"
+        app.router.add_get(f"{api}/users/@me", self.get_user)
+        app.router.add_get(f"{api}/oauth2/applications/@me", self.get_application)
+        app.router.add_get(f"{api}/gateway", self.get_gateway)
+        app.router.add_get(f"{api}/gateway/bot", self.get_gateway)
+        app.router.add_get(f"{api}/applications/{{app_id}}/commands", self.get_commands)
+        app.router.add_put(f"{api}/applications/{{app_id}}/commands", self.put_commands)
+        app.router.add_get(f"{api}/applications/{{app_id}}/guilds/{{guild_id}}/commands", self.get_commands)
+        app.router.add_put(f"{api}/applications/{{app_id}}/guilds/{{guild_id}}/commands", self.put_commands)
+        app.router.add_post(f"{api}/channels/{{channel_id}}/messages", self.create_message)
+        app.router.add_patch(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self.edit_message)
+        app.router.add_get(f"{api}/guilds/{{guild_id}}/members/{{user_id}}", self.get_member)
+        app.router.add_patch(f"{api}/guilds/{{guild_id}}/members/{{user_id}}", self.edit_member)
+        app.router.add_post(f"{api}/interactions/{{interaction_id}}/{{token}}/callback", self.interaction_callback)
+        app.router.add_post(f"{api}/webhooks/{{app_id}}/{{token}}", self.followup)
+        app.router.add_patch(f"{api}/webhooks/{{app_id}}/{{token}}/messages/@original", self.edit_original)
+        app.router.add_get("/gateway", self.gateway)
+        app.router.add_post("/_control/faults", self.control_faults)
+        app.router.add_post("/_control/join", self.control_join)
+        app.router.add_post("/_control/leave", self.control_leave)
+        app.router.add_post("/_control/click", self.control_click)
+        app.router.add_get("/_control/stats", self.control_stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every REST response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency, 0..N ms")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of REST calls answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="fraction of REST calls answered with 5xx")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="retry_after sent with injected 429s")
+    parser.add_argument("--admins", type=int, nargs="*", default=[USER_ID_BASE], help="user IDs given the admin role")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"guild {GUILD_ID}")
+    print(f"monitored voice channel {MONITORED_CHANNEL_ID}, lounge {LOUNGE_CHANNEL_ID}")
+    print(f"notify channel {NOTIFY_CHANNEL_ID}, log channel {LOG_CHANNEL_ID}")
+    web.run_app(FakeDiscord(args).app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()